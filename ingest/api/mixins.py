@@ -8,6 +8,7 @@ from django.db.models import Prefetch, Count, Q, F
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
 from django.views.decorators.vary import vary_on_headers
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework import status
 import hashlib
@@ -182,23 +183,31 @@ class CachedResponseMixin:
             logger.error(f"Failed to delete cache pattern {pattern}: {e}")
 
 
+class LargeTableCursorPagination(CursorPagination):
+    """
+    Cursor pagination برای جدول‌های بزرگ (Chunk، Embedding).
+    
+    به جای OFFSET از WHERE created_at < cursor استفاده می‌کند، پس هزینه هر صفحه
+    به عمق آن بستگی ندارد.
+    """
+    page_size = 50
+    ordering = '-created_at'
+
+
 class PaginationOptimizationMixin:
     """
     Mixin برای بهینه‌سازی pagination
     """
     
+    # مدل‌هایی که به جای PageNumberPagination پیش‌فرض با cursor صفحه‌بندی می‌شوند
+    cursor_paginated_models = frozenset({'Chunk', 'Embedding'})
+    
     def paginate_queryset(self, queryset):
         """Override to optimize pagination queries"""
         
         # Use cursor pagination for large datasets
-        if queryset.model.__name__ in ['Chunk', 'Embedding']:
-            from rest_framework.pagination import CursorPagination
-            
-            class OptimizedCursorPagination(CursorPagination):
-                page_size = 50
-                ordering = '-created_at'
-            
-            self.pagination_class = OptimizedCursorPagination
+        if queryset.model.__name__ in self.cursor_paginated_models:
+            self.pagination_class = LargeTableCursorPagination
         
         # Cache count for regular pagination
         else:
@@ -384,6 +393,7 @@ class FullyOptimizedViewMixin(
 
 # Export mixins
 __all__ = [
+    'LargeTableCursorPagination',
     'OptimizedQuerysetMixin',
     'CachedResponseMixin',
     'PaginationOptimizationMixin',
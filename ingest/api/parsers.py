@@ -0,0 +1,34 @@
+"""
+JSON parser backed by orjson.
+"""
+import io
+import re
+
+import orjson
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+# orjson اعداد صحیح خارج از بازه ۶۴ بیتی را بی‌صدا float می‌کند؛ بدنه‌ای که
+# رشته‌ای از ۱۹ رقم یا بیشتر دارد با json استاندارد خوانده می‌شود
+_LONG_DIGIT_RUN = re.compile(rb'\d{19}')
+
+
+class OrjsonParser(JSONParser):
+    """
+    JSONParser that decodes UTF-8 request bodies with orjson.
+
+    بدنه‌های غیر UTF-8، اعداد صحیح بزرگ و ورودی نامعتبر به JSONParser
+    استاندارد داده می‌شوند تا نتیجه و پیام خطا همان قبلی بماند.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        body = stream.read()
+        if encoding.lower().replace('-', '') == 'utf8' and not _LONG_DIGIT_RUN.search(body):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+        return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,35 @@
+"""
+JSON renderer backed by orjson.
+"""
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+# datetime/date/time به encoder خود DRF سپرده می‌شوند (دقت میلی‌ثانیه و پسوند Z)
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class OrjsonRenderer(JSONRenderer):
+    """
+    JSONRenderer that serializes compact responses with orjson.
+
+    انواعی که orjson نمی‌شناسد (Decimal، رشته‌های lazy، set و ...) از طریق
+    encoder_class خود DRF تبدیل می‌شوند. خروجی indent شده، ensure_ascii و
+    هر داده‌ای که orjson رد کند همچنان با JSONRenderer استاندارد تولید می‌شود.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if (not self.compact or self.ensure_ascii
+                or self.get_indent(accepted_media_type, renderer_context) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same strict-javascript-subset escaping as JSONRenderer
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
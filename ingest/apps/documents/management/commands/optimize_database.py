@@ -118,16 +118,16 @@ class Command(BaseCommand):
                idx_embedding_model_created 
                ON embeddings_embedding(model_id, created_at DESC);""",
             
-            # Full text search indexes (GIN indexes for text search)
+            # Full text search indexes (GIN on trigger-maintained tsvector columns)
             """CREATE INDEX CONCURRENTLY IF NOT EXISTS 
-               idx_legalunit_content_gin 
+               idx_legalunit_content_tsv_gin 
                ON documents_legalunit 
-               USING gin(to_tsvector('simple', content));""",
+               USING gin(content_tsv);""",
             
             """CREATE INDEX CONCURRENTLY IF NOT EXISTS 
-               idx_chunk_text_gin 
+               idx_chunk_text_tsv_gin 
                ON documents_chunk 
-               USING gin(to_tsvector('simple', chunk_text));""",
+               USING gin(chunk_text_tsv);""",
             
             # JSONB indexes
             """CREATE INDEX CONCURRENTLY IF NOT EXISTS 
@@ -136,22 +136,20 @@ class Command(BaseCommand):
                USING gin(citation_payload_json);""",
         ]
         
-        with connection.cursor() as cursor:
-            for index_sql in indexes:
-                try:
-                    start_time = time.time()
-                    cursor.execute(index_sql)
-                    duration = time.time() - start_time
-                    index_name = index_sql.split('IF NOT EXISTS')[1].split('ON')[0].strip()
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'  ✓ Created index {index_name} in {duration:.2f}s'
-                        )
-                    )
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.WARNING(f'  ✗ Failed to create index: {e}')
+        # CONCURRENTLY در transaction کار نمی‌کند؛ اجرا روی اتصال autocommit مستقل
+        from ingest.core.optimizations import DatabaseOptimizations
+        
+        for result in DatabaseOptimizations.apply_indexes(indexes):
+            if result['error'] is None:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"  ✓ Created index {result['name']} in {result['duration']:.2f}s"
                     )
+                )
+            else:
+                self.stdout.write(
+                    self.style.WARNING(f"  ✗ Failed to create index {result['name']}: {result['error']}")
+                )
     
     def analyze_tables(self):
         """اجرای ANALYZE برای به‌روزرسانی آمار جداول"""
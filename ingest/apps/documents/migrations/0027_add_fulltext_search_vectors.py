@@ -0,0 +1,123 @@
+# Generated manually
+# Stored tsvector columns for LegalUnit.content / Chunk.chunk_text so the
+# GIN full-text indexes match the query predicate (content_tsv @@ tsquery).
+#
+# documents_legalunit و documents_chunk بزرگ‌ترین جدول‌ها هستند؛ migration
+# غیر atomic است تا backfill در batch های جدا commit شود و index ها با
+# CONCURRENTLY (بدون قفل نوشتن) ساخته/حذف شوند.
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+BACKFILL_BATCH_SIZE = 5000
+
+TRIGGERS_SQL = """
+CREATE OR REPLACE TRIGGER documents_legalunit_content_tsv_trg
+    BEFORE INSERT OR UPDATE OF content ON documents_legalunit
+    FOR EACH ROW EXECUTE FUNCTION
+    tsvector_update_trigger(content_tsv, 'pg_catalog.simple', content);
+
+CREATE OR REPLACE TRIGGER documents_chunk_chunk_text_tsv_trg
+    BEFORE INSERT OR UPDATE OF chunk_text ON documents_chunk
+    FOR EACH ROW EXECUTE FUNCTION
+    tsvector_update_trigger(chunk_text_tsv, 'pg_catalog.simple', chunk_text);
+"""
+
+DROP_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS documents_legalunit_content_tsv_trg ON documents_legalunit;
+DROP TRIGGER IF EXISTS documents_chunk_chunk_text_tsv_trg ON documents_chunk;
+"""
+
+
+def backfill_tsvector(table, source, target):
+    """
+    پر کردن ستون tsvector ردیف‌های موجود در batch های BACKFILL_BATCH_SIZE تایی.
+
+    پیمایش با keyset روی id است و هر batch جدا commit می‌شود؛ ردیف‌هایی که در
+    این مدت درج یا ویرایش شوند را trigger پر می‌کند.
+    """
+    def run(apps, schema_editor):
+        connection = schema_editor.connection
+        qn = connection.ops.quote_name
+        table_q, source_q, target_q = qn(table), qn(source), qn(target)
+        last_id = None
+
+        while True:
+            with connection.cursor() as cursor:
+                if last_id is None:
+                    cursor.execute(
+                        f"SELECT id FROM {table_q} ORDER BY id LIMIT %s",
+                        [BACKFILL_BATCH_SIZE],
+                    )
+                else:
+                    cursor.execute(
+                        f"SELECT id FROM {table_q} WHERE id > %s ORDER BY id LIMIT %s",
+                        [last_id, BACKFILL_BATCH_SIZE],
+                    )
+                ids = [row[0] for row in cursor.fetchall()]
+                if not ids:
+                    break
+                cursor.execute(
+                    f"UPDATE {table_q} SET {target_q} = "
+                    f"to_tsvector('pg_catalog.simple', coalesce({source_q}, '')) "
+                    f"WHERE id = ANY(%s)",
+                    [ids],
+                )
+            last_id = ids[-1]
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    # CREATE/DROP INDEX CONCURRENTLY داخل transaction مجاز نیست
+    atomic = False
+
+    dependencies = [
+        ('documents', '0026_add_missing_historical_textentry_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='legalunit',
+            name='content_tsv',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='chunk',
+            name='chunk_text_tsv',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(sql=TRIGGERS_SQL, reverse_sql=DROP_TRIGGERS_SQL),
+        migrations.RunPython(
+            backfill_tsvector('documents_legalunit', 'content', 'content_tsv'),
+            migrations.RunPython.noop,
+        ),
+        migrations.RunPython(
+            backfill_tsvector('documents_chunk', 'chunk_text', 'chunk_text_tsv'),
+            migrations.RunPython.noop,
+        ),
+        # هر دستور CONCURRENTLY یک RunSQL جدا (چند دستور در یک رشته در یک
+        # transaction ضمنی اجرا می‌شوند)
+        migrations.RunSQL(
+            sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_legalunit_content_tsv_gin "
+                "ON documents_legalunit USING gin(content_tsv);",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS idx_legalunit_content_tsv_gin;",
+        ),
+        migrations.RunSQL(
+            sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunk_text_tsv_gin "
+                "ON documents_chunk USING gin(chunk_text_tsv);",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS idx_chunk_text_tsv_gin;",
+        ),
+        # index های قبلی روی to_tsvector(...) فقط پس از ساخته شدن جایگزین‌ها حذف می‌شوند
+        migrations.RunSQL(
+            sql="DROP INDEX CONCURRENTLY IF EXISTS idx_legalunit_content_gin;",
+            reverse_sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_legalunit_content_gin "
+                        "ON documents_legalunit USING gin(to_tsvector('simple', content));",
+        ),
+        migrations.RunSQL(
+            sql="DROP INDEX CONCURRENTLY IF EXISTS idx_chunk_text_gin;",
+            reverse_sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunk_text_gin "
+                        "ON documents_chunk USING gin(to_tsvector('simple', chunk_text));",
+        ),
+    ]
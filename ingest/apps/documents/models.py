@@ -4,6 +4,7 @@ from django.utils import timezone
 from django.core.files.storage import default_storage
 from django.core.exceptions import ValidationError
 from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.postgres.search import SearchQuery, SearchVectorField
 from django.db.models import Q, F, CheckConstraint
 from mptt.models import MPTTModel, TreeForeignKey
 from simple_history.models import HistoricalRecords
@@ -34,6 +35,17 @@ class LegalUnitQuerySet(models.QuerySet):
         from django.utils.timezone import localdate
         today = localdate()
         return self.filter(valid_to__lt=today)
+    
+    def search_content(self, query: str):
+        """
+        Full-text search on content via the GIN-indexed content_tsv column.
+        
+        The GIN index is only used when the predicate targets content_tsv
+        itself (tsvector @@ tsquery with the same 'simple' config); filtering
+        on content or an ad-hoc to_tsvector() with another config falls back
+        to a sequential scan.
+        """
+        return self.filter(content_tsv=SearchQuery(query, config='simple'))
 
 
 class LegalUnitManager(models.Manager):
@@ -53,6 +65,10 @@ class LegalUnitManager(models.Manager):
     def expired(self):
         """Return units that have expired."""
         return self.get_queryset().expired()
+    
+    def search_content(self, query: str):
+        """Full-text search on content (see LegalUnitQuerySet.search_content)."""
+        return self.get_queryset().search_content(query)
 
 
 class InstrumentWork(BaseModel):
@@ -297,6 +313,8 @@ class LegalUnit(MPTTModel, BaseModel):
     order_index = models.CharField(max_length=50, blank=True, default='', verbose_name='ترتیب')
     path_label = models.CharField(max_length=500, blank=True, verbose_name='مسیر کامل')
     content = models.TextField(verbose_name='محتوا')
+    # to_tsvector('simple', content) - maintained by a DB trigger (migration 0027)
+    content_tsv = SearchVectorField(null=True, editable=False)
     
     # New Akoma Ntoso identifiers
     eli_fragment = models.CharField(max_length=200, blank=True, verbose_name='ELI Fragment')
@@ -330,7 +348,7 @@ class LegalUnit(MPTTModel, BaseModel):
     # Custom manager for temporal queries
     objects = LegalUnitManager()
     
-    history = HistoricalRecords(excluded_fields=['lft', 'rght', 'tree_id', 'level'])
+    history = HistoricalRecords(excluded_fields=['lft', 'rght', 'tree_id', 'level', 'content_tsv'])
 
     class MPTTMeta:
         order_insertion_by = ['order_index']
@@ -734,6 +752,8 @@ class Chunk(BaseModel):
     )
     
     chunk_text = models.TextField(verbose_name='متن چانک')
+    # to_tsvector('simple', chunk_text) - maintained by a DB trigger (migration 0027)
+    chunk_text_tsv = SearchVectorField(null=True, editable=False)
     token_count = models.PositiveIntegerField(verbose_name='تعداد توکن')
     overlap_prev = models.PositiveIntegerField(default=0, verbose_name='همپوشانی با قبلی')
     citation_payload_json = models.JSONField(verbose_name='اطلاعات ارجاع')
@@ -756,7 +776,7 @@ class Chunk(BaseModel):
         object_id_field="object_id",
     )
     
-    history = HistoricalRecords()
+    history = HistoricalRecords(excluded_fields=['chunk_text_tsv'])
 
     class Meta:
         verbose_name = 'قطعه متن (Chunk)'
@@ -42,7 +42,7 @@ class EmbeddingAdmin(SimpleJalaliAdminMixin, SimpleHistoryAdmin):
     def sync_to_core(self, request, queryset):
         """Action to sync selected embeddings to Core"""
         from ingest.core.sync.sync_service import CoreSyncService
-        from ingest.core.sync.payload_builder import build_summary_payload, calculate_metadata_hash
+        from ingest.core.sync.payload_builder import build_summary_payloads, calculate_metadata_hash
         from django.db import transaction
         
         service = CoreSyncService()
@@ -56,8 +56,7 @@ class EmbeddingAdmin(SimpleJalaliAdminMixin, SimpleHistoryAdmin):
         payloads = []
         embedding_map = {}
         
-        for emb in queryset:
-            payload = build_summary_payload(emb)
+        for emb, payload in build_summary_payloads(queryset):
             if payload:
                 payloads.append(payload)
                 embedding_map[str(emb.id)] = emb
@@ -77,6 +76,7 @@ class EmbeddingAdmin(SimpleJalaliAdminMixin, SimpleHistoryAdmin):
                     emb.synced_to_core = True
                     emb.synced_at = timezone.now()
                     emb.sync_error = ''
+                    emb.synced_metadata_hash = emb.metadata_hash
                     emb.save()
             
             self.message_user(request, f'Successfully synced {len(payloads)} embeddings', level=messages.SUCCESS)
@@ -5,6 +5,7 @@ import os
 import logging
 from typing import List, Optional
 import torch
+from django.conf import settings
 
 from .base import EmbeddingBackend, EmbeddingResult, EmbeddingModelError, EmbeddingConfigError
 
@@ -21,8 +22,9 @@ class E5Multilingual(EmbeddingBackend):
     
     def __init__(self):
         self.model_name = os.getenv('EMBEDDING_E5_MODEL_NAME', 'intfloat/multilingual-e5-large')
-        self.batch_size = int(os.getenv('EMBEDDING_BATCH_SIZE', '16'))
         self.device = os.getenv('EMBEDDING_DEVICE', 'cuda' if torch.cuda.is_available() else 'cpu')
+        batch_size = getattr(settings, 'EMBEDDING_BATCH_SIZE', None)
+        self.batch_size = int(batch_size) if batch_size else self._auto_batch_size(self.device)
         self.max_seq_length = int(os.getenv('EMBEDDING_MAX_SEQ_LENGTH', '512'))
         self.model_cache_dir = os.getenv('EMBEDDING_MODEL_CACHE_DIR', '/app/models')
         
@@ -39,9 +41,27 @@ class E5Multilingual(EmbeddingBackend):
         self._tokenizer = None
         self._cached_dim = None
         
-        logger.info(f"Initialized E5 Multilingual backend: {self.model_name}, device: {self.device}")
+        logger.info(f"Initialized E5 Multilingual backend: {self.model_name}, device: {self.device}, batch size: {self.batch_size}")
         logger.info(f"Local model path: {self.local_model_path}")
     
+    @staticmethod
+    def _auto_batch_size(device: str) -> int:
+        """
+        Batch size based on GPU memory when EMBEDDING_BATCH_SIZE is not set.
+        
+        حدود ۴ متن به ازای هر گیگابایت حافظه GPU (بین ۸ و ۲۵۶)؛ روی CPU همان ۱۶ قبلی.
+        """
+        if not device.startswith('cuda') or not torch.cuda.is_available():
+            return 16
+        try:
+            index = torch.device(device).index
+            total_memory = torch.cuda.get_device_properties(index if index is not None else 0).total_memory
+        except Exception as e:
+            logger.warning(f"Could not read GPU memory for batch sizing: {e}")
+            return 16
+        total_memory_gb = total_memory / (1024 ** 3)
+        return min(256, max(8, int(total_memory_gb * 4)))
+    
     def _load_model(self):
         """Lazy load the E5 multilingual model."""
         if self._model is not None:
@@ -116,6 +136,23 @@ class E5Multilingual(EmbeddingBackend):
         else:
             return f"passage: {normalized_text}"
     
+    def _prepare_texts(self, texts: List[str], task_type: str = "passage") -> List[str]:
+        """
+        Prepare a batch of texts for E5 (normalized once per distinct text).
+        """
+        try:
+            from ingest.core.text_processing import prepare_for_embedding_batch
+            normalized_texts = prepare_for_embedding_batch(texts)
+        except ImportError:
+            # Fallback if text processing not available
+            normalized_texts = [text.strip() if text else "" for text in texts]
+        
+        prefix = "query: " if task_type == "query" else "passage: "
+        return [
+            f"{prefix}{normalized_text}" if text else ""
+            for text, normalized_text in zip(texts, normalized_texts)
+        ]
+    
     def embed(self, texts: List[str], task: Optional[str] = None, **kwargs) -> EmbeddingResult:
         """
         Generate embeddings for a list of texts.
@@ -142,7 +179,7 @@ class E5Multilingual(EmbeddingBackend):
                 task_type = "passage"
             
             # Prepare texts with E5 instructions
-            prepared_texts = [self._prepare_text(text, task_type) for text in texts]
+            prepared_texts = self._prepare_texts(texts, task_type)
             
             # Generate embeddings in batches
             all_embeddings = []
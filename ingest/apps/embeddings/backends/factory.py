@@ -112,6 +112,8 @@ def get_backend_info(provider: Optional[str] = None) -> dict:
             info['model_name'] = backend.model_name
         if hasattr(backend, 'device'):
             info['device'] = backend.device
+        if hasattr(backend, 'batch_size'):
+            info['batch_size'] = backend.batch_size
         if hasattr(backend, 'model_path'):
             info['model_path'] = backend.model_path
         
@@ -66,7 +66,7 @@ class Command(BaseCommand):
         self.stdout.write(f"  Provider: {provider}")
         self.stdout.write(f"  Model ID: {getattr(settings, 'EMBEDDING_MODEL_ID', 'auto-detect')}")
         self.stdout.write(f"  Dimension: {getattr(settings, 'EMBEDDING_DIMENSION', 'auto-detect')}")
-        self.stdout.write(f"  Batch Size: {getattr(settings, 'EMBEDDING_BATCH_SIZE', 32)}")
+        self.stdout.write(f"  Batch Size: {getattr(settings, 'EMBEDDING_BATCH_SIZE', None) or 'auto'}")
         self.stdout.write(f"  Read Model ID: {getattr(settings, 'EMBEDDINGS_READ_MODEL_ID', 'current')}")
         
         if provider == 'hakim':
@@ -99,6 +99,9 @@ class Command(BaseCommand):
                 self.stdout.write(f"  Model Name: {backend_info['model_name']}")
             if 'device' in backend_info:
                 self.stdout.write(f"  Device: {backend_info['device']}")
+            if 'batch_size' in backend_info:
+                # اندازه batch واقعی backend (در حالت auto از حافظه GPU)
+                self.stdout.write(f"  Effective Batch Size: {backend_info['batch_size']}")
                 
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"  Failed to get backend info: {e}"))
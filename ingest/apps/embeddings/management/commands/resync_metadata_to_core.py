@@ -4,11 +4,15 @@ This fixes the missing unit_type issue in existing nodes.
 """
 from django.core.management.base import BaseCommand
 from django.db.models import Q
+from django.utils import timezone
+from simple_history.utils import bulk_update_with_history
 from ingest.apps.embeddings.models import Embedding, CoreConfig
 from ingest.apps.embeddings.models_synclog import SyncLog
 from ingest.apps.documents.models import Chunk
-from ingest.core.sync.payload_builder import build_summary_payload
-import requests
+from ingest.core.sync.http_session import core_http_session
+from ingest.core.sync.payload_builder import (
+    build_summary_payloads, calculate_metadata_hash, dumps_payload, dumps_sync_body
+)
 import hashlib
 import time
 
@@ -73,6 +77,9 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS('✅ Nothing to resync'))
             return
         
+        from django.contrib.contenttypes.models import ContentType
+        chunk_ct = ContentType.objects.get_for_model(Chunk)
+        
         # Process in batches
         processed = 0
         updated = 0
@@ -81,27 +88,34 @@ class Command(BaseCommand):
         skipped = 0
         
         for i in range(0, total_chunks, batch_size):
-            batch = chunks[i:i + batch_size]
+            batch = list(chunks[i:i + batch_size])
             self.stdout.write(f'\n📦 Processing batch {i//batch_size + 1} ({i+1}-{min(i+batch_size, total_chunks)} of {total_chunks})')
             
+            # Embedding ها و payload های کل batch یک‌جا (به جای یک query به ازای هر chunk)
+            embeddings = {}
+            for emb in Embedding.objects.filter(
+                content_type=chunk_ct,
+                object_id__in=[chunk.id for chunk in batch],
+                synced_to_core=True
+            ).order_by('-created_at'):
+                embeddings.setdefault(str(emb.object_id), emb)
+            payloads = {
+                str(emb.object_id): payload
+                for emb, payload in build_summary_payloads(embeddings.values())
+            }
+            
+            synced_embeddings = []
+            
             for chunk in batch:
                 processed += 1
                 
                 # Get embedding for this chunk
-                from django.contrib.contenttypes.models import ContentType
-                chunk_ct = ContentType.objects.get_for_model(Chunk)
-                embedding = Embedding.objects.filter(
-                    content_type=chunk_ct,
-                    object_id=chunk.id,
-                    synced_to_core=True
-                ).first()
-                
-                if not embedding:
+                if str(chunk.id) not in embeddings:
                     skipped += 1
                     continue
                 
                 # Build new payload with fixed metadata
-                payload = build_summary_payload(embedding)
+                payload = payloads.get(str(chunk.id))
                 if not payload:
                     self.stdout.write(self.style.WARNING(f'  ⚠️  Could not build payload for chunk {chunk.id}'))
                     failed += 1
@@ -109,24 +123,36 @@ class Command(BaseCommand):
                 
                 # Try to update in Core (POST /api/v1/sync/embeddings)
                 if not dry_run:
-                    success = self._update_in_core(config, payload, chunk)
+                    # یک بار سریال می‌شود و برای update و recreate استفاده می‌شود
+                    raw_payload = dumps_payload(payload)
+                    success = self._update_in_core(config, raw_payload, chunk)
                     if success:
                         updated += 1
                         self.stdout.write(f'  ✅ Updated chunk {str(chunk.id)[:8]}... ({chunk.textentry_id or chunk.qaentry_id})')
                     else:
                         # If update fails, try delete and recreate
                         self.stdout.write(f'  ⚠️  Update failed, trying delete+recreate for chunk {str(chunk.id)[:8]}...')
-                        success = self._delete_and_recreate(config, payload, chunk)
+                        success = self._delete_and_recreate(config, raw_payload, chunk)
                         if success:
                             deleted_recreated += 1
                             self.stdout.write(f'  ✅ Deleted and recreated chunk {str(chunk.id)[:8]}...')
                         else:
                             failed += 1
                             self.stdout.write(self.style.ERROR(f'  ❌ Failed to resync chunk {str(chunk.id)[:8]}...'))
+                    
+                    if success:
+                        # hash ارسال‌شده ثبت می‌شود تا sync_changed_metadata با hash کهنه
+                        # مقایسه نکند (و بازگشت metadata به حالت قبل را نادیده نگیرد)
+                        emb = embeddings[str(chunk.id)]
+                        emb.metadata_hash = emb.synced_metadata_hash = calculate_metadata_hash(payload)
+                        synced_embeddings.append(emb)
                 else:
                     self.stdout.write(f'  [DRY RUN] Would update chunk {str(chunk.id)[:8]}... (type: {payload["document_type"]})')
                     updated += 1
             
+            if synced_embeddings:
+                self._mark_metadata_synced(synced_embeddings)
+            
             # Small delay between batches
             if not dry_run and i + batch_size < total_chunks:
                 time.sleep(0.5)
@@ -149,7 +175,18 @@ class Command(BaseCommand):
         else:
             self.stdout.write(self.style.WARNING('\n⚠️  DRY RUN completed - no changes were made'))
     
-    def _update_in_core(self, config, payload, chunk):
+    def _mark_metadata_synced(self, embeddings):
+        """ثبت hash و زمان sync متادیتای ارسال‌شده (مثل CoreSyncService._mark_synced)"""
+        now = timezone.now()
+        for emb in embeddings:
+            emb.last_metadata_sync = now
+            emb.updated_at = now  # bulk_update فیلد auto_now را تنظیم نمی‌کند
+        
+        bulk_update_with_history(embeddings, Embedding, [
+            'metadata_hash', 'synced_metadata_hash', 'last_metadata_sync', 'updated_at'
+        ])
+    
+    def _update_in_core(self, config, raw_payload, chunk):
         """Update node in Core using POST /api/v1/sync/embeddings"""
         try:
             headers = {'Content-Type': 'application/json'}
@@ -157,9 +194,9 @@ class Command(BaseCommand):
                 headers['X-API-Key'] = config.core_api_key
             
             url = f"{config.core_api_url}/api/v1/sync/embeddings"
-            response = requests.post(
+            response = core_http_session().post(
                 url,
-                json={'embeddings': [payload], 'sync_type': 'metadata_update'},
+                data=dumps_sync_body([raw_payload], 'metadata_update'),
                 headers=headers,
                 timeout=10
             )
@@ -169,7 +206,7 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(f'    Error updating in Core: {e}'))
             return False
     
-    def _delete_and_recreate(self, config, payload, chunk):
+    def _delete_and_recreate(self, config, raw_payload, chunk):
         """Delete node from Core and recreate with new metadata"""
         try:
             headers = {'Content-Type': 'application/json'}
@@ -183,7 +220,7 @@ class Command(BaseCommand):
             
             # Delete
             delete_url = f"{config.core_api_url}/api/v1/sync/node/{point_id}"
-            delete_response = requests.delete(delete_url, headers=headers, timeout=10)
+            delete_response = core_http_session().delete(delete_url, headers=headers, timeout=10)
             
             if delete_response.status_code not in [200, 204, 404]:
                 return False
@@ -193,9 +230,9 @@ class Command(BaseCommand):
             
             # Recreate
             create_url = f"{config.core_api_url}/api/v1/sync/embeddings"
-            create_response = requests.post(
+            create_response = core_http_session().post(
                 create_url,
-                json={'embeddings': [payload], 'sync_type': 'incremental'},
+                data=dumps_sync_body([raw_payload], 'incremental'),
                 headers=headers,
                 timeout=10
             )
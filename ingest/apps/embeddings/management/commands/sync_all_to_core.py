@@ -93,41 +93,19 @@ class Command(BaseCommand):
             return
         
         # Start syncing
+        # batch ها به صورت pipeline ارسال می‌شوند: ساخت payload batch بعدی
+        # همزمان با ارسال HTTP batch های قبلی (CORE_SYNC_WORKERS)
         service = CoreSyncService()
-        total_synced = 0
-        total_errors = 0
-        batch_num = 0
         
         self.stdout.write(f'Starting sync of {unsynced_count} embeddings...')
         self.stdout.write('')
         
-        while True:
-            batch_num += 1
-            self.stdout.write(f'Batch {batch_num}... ', ending='')
-            
-            result = service.sync_new_embeddings(batch_size=batch_size)
-            
-            if result['status'] == 'nothing_to_sync':
-                self.stdout.write(self.style.SUCCESS('Done!'))
-                break
-            elif result['status'] == 'success':
-                synced = result['synced']
-                total_synced += synced
-                self.stdout.write(self.style.SUCCESS(f'✓ Synced {synced} embeddings'))
-            elif result['status'] == 'disabled':
-                raise CommandError(f'Sync is disabled: {result["message"]}')
-            else:
-                total_errors += 1
-                error_msg = result.get('error', 'Unknown error')
-                self.stdout.write(self.style.ERROR(f'✗ Error: {error_msg}'))
-                
-                # Ask if should continue
-                if batch_num > 1:
-                    response = input('\nContinue despite error? [y/N]: ')
-                    if response.lower() != 'y':
-                        break
-                else:
-                    break
+        result = service.sync_pending_embeddings(batch_size=batch_size)
+        if result['status'] == 'disabled':
+            raise CommandError(f'Sync is disabled: {result["message"]}')
+        
+        total_synced = result['total_synced']
+        total_errors = result['total_errors']
         
         # Final statistics
         self.stdout.write('')
@@ -136,7 +114,6 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS('=' * 70))
         self.stdout.write(f'Total Synced: {total_synced}')
         self.stdout.write(f'Total Errors: {total_errors}')
-        self.stdout.write(f'Batches Processed: {batch_num}')
         
         # Updated config stats
         config.refresh_from_db()
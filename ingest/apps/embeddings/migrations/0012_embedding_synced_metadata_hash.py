@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('embeddings', '0011_deletionlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='embedding',
+            name='synced_metadata_hash',
+            field=models.CharField(
+                max_length=64,
+                blank=True,
+                default='',
+                verbose_name='هش متادیتای ارسال‌شده',
+                help_text='هش metadata آخرین payload ارسال‌شده به Core (با invalidate شدن metadata_hash پاک نمی‌شود)'
+            ),
+        ),
+        migrations.AddField(
+            model_name='historicalembedding',
+            name='synced_metadata_hash',
+            field=models.CharField(
+                max_length=64,
+                blank=True,
+                default='',
+                verbose_name='هش متادیتای ارسال‌شده',
+                help_text='هش metadata آخرین payload ارسال‌شده به Core (با invalidate شدن metadata_hash پاک نمی‌شود)'
+            ),
+        ),
+    ]
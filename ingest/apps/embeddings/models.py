@@ -250,6 +250,14 @@ class Embedding(BaseModel):
         help_text='هش SHA256 از metadata برای detect کردن تغییرات'
     )
     
+    synced_metadata_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        verbose_name='هش متادیتای ارسال‌شده',
+        help_text='هش metadata آخرین payload ارسال‌شده به Core (با invalidate شدن metadata_hash پاک نمی‌شود)'
+    )
+    
     last_metadata_sync = models.DateTimeField(
         null=True,
         blank=True,
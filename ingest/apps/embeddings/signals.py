@@ -11,7 +11,7 @@ from ingest.apps.documents.models import (
     LegalUnit, InstrumentWork, InstrumentExpression, 
     InstrumentManifestation, Chunk, QAEntry, TextEntry
 )
-from ingest.apps.embeddings.models import Embedding
+from ingest.apps.embeddings.models import Embedding, CoreConfig
 
 User = get_user_model()
 
@@ -37,6 +37,8 @@ def invalidate_unit_embeddings(sender, instance, **kwargs):
         content_type=chunk_ct,
         object_id__in=chunk_ids,
         synced_to_core=True
+    ).exclude(
+        metadata_hash=''  # قبلاً invalidate شده؛ UPDATE تکراری لازم نیست
     ).update(
         metadata_hash=''  # This will trigger re-sync on next metadata check
     )
@@ -60,7 +62,7 @@ def invalidate_work_embeddings(sender, instance, **kwargs):
         content_type=chunk_ct,
         object_id__in=chunk_ids,
         synced_to_core=True
-    ).update(metadata_hash='')
+    ).exclude(metadata_hash='').update(metadata_hash='')
 
 
 @receiver(post_save, sender=InstrumentExpression)
@@ -78,7 +80,7 @@ def invalidate_expression_embeddings(sender, instance, **kwargs):
         content_type=chunk_ct,
         object_id__in=chunk_ids,
         synced_to_core=True
-    ).update(metadata_hash='')
+    ).exclude(metadata_hash='').update(metadata_hash='')
 
 
 @receiver(post_save, sender=InstrumentManifestation)
@@ -98,7 +100,7 @@ def invalidate_manifestation_embeddings(sender, instance, **kwargs):
         content_type=chunk_ct,
         object_id__in=chunk_ids,
         synced_to_core=True
-    ).update(metadata_hash='')
+    ).exclude(metadata_hash='').update(metadata_hash='')
 
 
 @receiver(m2m_changed, sender=LegalUnit.vocabulary_terms.through)
@@ -118,7 +120,7 @@ def invalidate_unit_tags_embeddings(sender, instance, action, **kwargs):
         content_type=chunk_ct,
         object_id__in=chunk_ids,
         synced_to_core=True
-    ).update(metadata_hash='')
+    ).exclude(metadata_hash='').update(metadata_hash='')
 
 
 @receiver(post_save, sender=QAEntry)
@@ -133,7 +135,7 @@ def invalidate_qa_embeddings(sender, instance, **kwargs):
         content_type=qa_ct,
         object_id=instance.id,
         synced_to_core=True
-    ).update(metadata_hash='')
+    ).exclude(metadata_hash='').update(metadata_hash='')
 
 
 @receiver(m2m_changed, sender=QAEntry.tags.through)
@@ -148,7 +150,7 @@ def invalidate_qa_tags_embeddings(sender, instance, action, **kwargs):
         content_type=qa_ct,
         object_id=instance.id,
         synced_to_core=True
-    ).update(metadata_hash='')
+    ).exclude(metadata_hash='').update(metadata_hash='')
 
 
 # ============================================================================
@@ -167,7 +169,7 @@ def invalidate_text_entry_embeddings(sender, instance, **kwargs):
         content_type=te_ct,
         object_id=instance.id,
         synced_to_core=True
-    ).update(metadata_hash='')
+    ).exclude(metadata_hash='').update(metadata_hash='')
 
 
 @receiver(m2m_changed, sender=TextEntry.vocabulary_terms.through)
@@ -182,7 +184,7 @@ def invalidate_text_entry_tags_embeddings(sender, instance, action, **kwargs):
         content_type=te_ct,
         object_id=instance.id,
         synced_to_core=True
-    ).update(metadata_hash='')
+    ).exclude(metadata_hash='').update(metadata_hash='')
 
 
 @receiver(m2m_changed, sender=TextEntry.related_units.through)
@@ -197,7 +199,7 @@ def invalidate_text_entry_units_embeddings(sender, instance, action, **kwargs):
         content_type=te_ct,
         object_id=instance.id,
         synced_to_core=True
-    ).update(metadata_hash='')
+    ).exclude(metadata_hash='').update(metadata_hash='')
 
 
 @receiver(m2m_changed, sender=QAEntry.related_units.through)
@@ -212,7 +214,23 @@ def invalidate_qa_units_embeddings(sender, instance, action, **kwargs):
         content_type=qa_ct,
         object_id=instance.id,
         synced_to_core=True
-    ).update(metadata_hash='')
+    ).exclude(metadata_hash='').update(metadata_hash='')
+
+
+# ============================================================================
+# CORE CONFIG CACHE
+# ============================================================================
+
+@receiver(post_save, sender=CoreConfig)
+def invalidate_core_config_cache(sender, instance, **kwargs):
+    """Drop cached CoreConfig so verifiers/deleters pick up new settings."""
+    from django.core.cache import cache
+    from ingest.core.optimizations import CacheStrategy
+    from ingest.core.sync.node_verifier import reset_core_config_cache
+    
+    reset_core_config_cache()
+    # کلید cache دقیق است؛ SCAN روی کل keyspace (invalidate_pattern) لازم نیست
+    cache.delete(CacheStrategy.key_for('core_config'))
 
 
 @receiver(m2m_changed, sender=User.user_permissions.through)
@@ -1,5 +1,8 @@
 import numpy as np
 import logging
+import os
+import time
+from datetime import datetime
 from celery import shared_task
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
@@ -32,8 +35,6 @@ def batch_generate_embeddings_for_queryset(self, queryset_ids: List[str], model_
     Generate embeddings for a queryset of objects in batches.
     Returns a dictionary with statistics about the operation.
     """
-    import time
-    from datetime import datetime
     from sentence_transformers import SentenceTransformer
     
     # Start timing
@@ -184,7 +185,6 @@ def generate_real_embedding(text: str, model_name: str = "intfloat/multilingual-
     """
     try:
         from sentence_transformers import SentenceTransformer
-        import os
         
         cache_dir = '/app/models'
         os.makedirs(cache_dir, exist_ok=True)
@@ -216,8 +216,6 @@ def generate_single_embedding(text: str, model_name: str = None) -> Dict[str, An
     """
     try:
         from sentence_transformers import SentenceTransformer
-        import time
-        import os
         
         start_time = time.time()
         
@@ -1,5 +1,7 @@
+import gc
 import os
 from celery import Celery
+from celery.signals import worker_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ingest.settings.dev')
@@ -12,3 +14,25 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
+
+
+@worker_init.connect
+def warm_up_text_normalizer(**kwargs):
+    """Load hazm once in the parent so prefork children inherit it."""
+    from ingest.core.text_processing import warm_up_text_normalizer
+    warm_up_text_normalizer()
+
+
+@worker_init.connect
+def tune_worker_gc(**kwargs):
+    """
+    Tune the garbage collector for embedding batches.
+
+    بعد از warm-up، اشیای Django/hazm با gc.freeze از پیمایش‌های بعدی gc خارج
+    می‌شوند (قبل از fork، پس فرزندان prefork هم از آن بهره می‌برند) و آستانه
+    نسل ۰ بالا می‌رود تا تخصیص‌های موقت هر batch، gc مکرر راه نیندازند.
+    """
+    threshold0 = int(os.getenv('CELERY_WORKER_GC_THRESHOLD0', '10000'))
+    _, threshold1, threshold2 = gc.get_threshold()
+    gc.set_threshold(threshold0, threshold1, threshold2)
+    gc.freeze()
@@ -0,0 +1,55 @@
+"""
+Logging handlers for the Ingest project.
+"""
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+class QueuedRotatingFileHandler(QueueHandler):
+    """
+    RotatingFileHandler behind a queue.
+
+    thread درخواست فقط رکورد را در صف می‌گذارد؛ نوشتن و rotate فایل در thread
+    یک QueueListener انجام می‌شود. قابل استفاده در dictConfig پایتون 3.11
+    (که هنوز listener را خودش راه‌اندازی نمی‌کند).
+    """
+
+    def __init__(self, filename, maxBytes=0, backupCount=0, encoding=None):
+        super().__init__(queue.SimpleQueue())
+        self.file_handler = RotatingFileHandler(
+            filename, maxBytes=maxBytes, backupCount=backupCount,
+            encoding=encoding, delay=True
+        )
+        self._listener = None
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        # thread listener بعد از fork (worker های prefork سلری) در فرزند وجود ندارد
+        if self._listener_pid == os.getpid():
+            return
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                return
+            if self._listener_pid is not None:
+                # صف کپی‌شده از والد ممکن است رکوردهای ناتمام داشته باشد
+                self.queue = queue.SimpleQueue()
+            self._listener = QueueListener(self.queue, self.file_handler)
+            self._listener.start()
+            self._listener_pid = os.getpid()
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        self.queue.put_nowait(record)
+
+    def close(self):
+        with self._listener_lock:
+            if self._listener is not None and self._listener_pid == os.getpid():
+                # stop() پیش از بازگشت صف را تخلیه می‌کند
+                self._listener.stop()
+            self._listener = None
+            self._listener_pid = None
+        self.file_handler.close()
+        super().close()
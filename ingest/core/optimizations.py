@@ -4,11 +4,13 @@ Performance optimizations for the Ingest application.
 """
 
 from django.core.cache import cache
-from django.db.models import Prefetch, Count, Q, F
+from django.db.models import Prefetch, Count, Q, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
 from django.contrib.postgres.aggregates import ArrayAgg
-from functools import wraps
+from contextlib import contextmanager
+from functools import lru_cache, wraps
 import hashlib
 import json
 from typing import Any, Optional
@@ -18,12 +20,35 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+# ساختار استاندارد کلیدهای cache: نام -> قالب کلید ({domain}:{id}:{sub_id})؛
+# TTL از duration در cache_result می‌آید
+CACHE_SCHEMAS = {
+    'core_config': 'core_config',
+}
+
+
 class QueryOptimizer:
     """کلاس برای بهینه‌سازی Query های دیتابیس"""
     
+    @staticmethod
+    def _count_subquery(model, fk_field):
+        """
+        شمارش ردیف‌های مرتبط با یک Subquery همبسته (OuterRef('pk')).
+        
+        برخلاف چند Count(...) در یک annotate، هر شمارش JOIN جداگانه‌ای
+        نمی‌سازد و ردیف‌ها در هم ضرب نمی‌شوند.
+        """
+        counts = model.objects.filter(
+            **{fk_field: OuterRef('pk')}
+        ).order_by().values(fk_field).annotate(c=Count('*')).values('c')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    
     @staticmethod
     def optimize_legalunit_queryset(queryset):
         """بهینه‌سازی QuerySet برای LegalUnit با کاهش N+1 queries"""
+        from ingest.apps.documents.models import Chunk, FileAsset, LegalUnit
+        from ingest.apps.embeddings.models_synclog import SyncLog
+        
         return queryset.select_related(
             'work',
             'work__organization',
@@ -45,9 +70,9 @@ class QueryOptimizer:
                 )
             )
         ).annotate(
-            chunk_count=Count('chunks'),
-            file_count=Count('files'),
-            child_count=Count('children')
+            chunk_count=QueryOptimizer._count_subquery(Chunk, 'unit'),
+            file_count=QueryOptimizer._count_subquery(FileAsset, 'legal_unit'),
+            child_count=QueryOptimizer._count_subquery(LegalUnit, 'parent')
         )
     
     @staticmethod
@@ -113,21 +138,34 @@ class CacheStrategy:
         
         key_string = ":".join(key_parts)
         if len(key_string) > 200:  # Redis key limit
-            # Use hash for long keys
-            hash_digest = hashlib.md5(key_string.encode()).hexdigest()
-            return f"{prefix}:hash:{hash_digest}"
+            # Use hash for long keys (BLAKE2b-128: faster than MD5, FIPS-safe)
+            hash_digest = hashlib.blake2b(key_string.encode('utf-8'), digest_size=16).hexdigest()
+            return f"{prefix}:b2:{hash_digest}"
         
         return key_string
     
+    @staticmethod
+    def key_for(schema: str, **kwargs) -> str:
+        """ساخت کلید cache از روی CACHE_SCHEMAS (مثلاً key_for('core_config'))"""
+        return CACHE_SCHEMAS[schema].format(**kwargs)
+    
     @classmethod
-    def cache_result(cls, duration='medium', key_prefix=None):
-        """Decorator برای cache کردن نتیجه متدها"""
+    def cache_result(cls, duration='medium', key_prefix=None, key_fn=None):
+        """
+        Decorator برای cache کردن نتیجه متدها.
+        
+        اگر key_fn داده شود، کلید مستقیماً از key_fn(*args, **kwargs) ساخته می‌شود
+        و cache_key_generator (مرتب‌سازی kwargs و الحاق رشته‌ها) اجرا نمی‌شود.
+        """
         def decorator(func):
             @wraps(func)
             def wrapper(*args, **kwargs):
                 # Generate cache key
-                prefix = key_prefix or f"{func.__module__}.{func.__name__}"
-                cache_key = cls.cache_key_generator(prefix, *args, **kwargs)
+                if key_fn is not None:
+                    cache_key = key_fn(*args, **kwargs)
+                else:
+                    prefix = key_prefix or f"{func.__module__}.{func.__name__}"
+                    cache_key = cls.cache_key_generator(prefix, *args, **kwargs)
                 
                 # Try to get from cache
                 result = cache.get(cache_key)
@@ -152,10 +190,22 @@ class CacheStrategy:
         try:
             from django_redis import get_redis_connection
             redis_conn = get_redis_connection("default")
-            keys = redis_conn.keys(f"ingest:{pattern}*")
-            if keys:
-                redis_conn.delete(*keys)
-                logger.info(f"Invalidated {len(keys)} cache keys matching pattern: {pattern}")
+            # make_key prefix و version را اضافه می‌کند (مثلاً ingest:1:{pattern}*)
+            match = cache.make_key(f"{pattern}*")
+            
+            # SCAN به جای KEYS (بدون block کردن Redis) و UNLINK به جای DEL (آزادسازی async)
+            deleted = 0
+            cursor = 0
+            while True:
+                cursor, batch = redis_conn.scan(cursor, match=match, count=500)
+                if batch:
+                    redis_conn.unlink(*batch)
+                    deleted += len(batch)
+                if cursor == 0:
+                    break
+            
+            if deleted:
+                logger.info(f"Invalidated {deleted} cache keys matching pattern: {pattern}")
         except Exception as e:
             logger.error(f"Failed to invalidate cache pattern {pattern}: {e}")
 
@@ -181,13 +231,256 @@ class DatabaseOptimizations:
             "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_legalunit_active ON documents_legalunit(work_id) WHERE valid_to IS NULL OR valid_to > CURRENT_DATE;",
             "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_synclog_unverified ON embeddings_synclog(synced_at) WHERE status = 'synced' AND verified_at IS NULL;",
             
-            # Full text search indexes (if using PostgreSQL full text search)
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_legalunit_content_gin ON documents_legalunit USING gin(to_tsvector('simple', content));",
-            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunk_text_gin ON documents_chunk USING gin(to_tsvector('simple', chunk_text));",
+            # Covering indexes (index-only scans for SyncLog lookups by node_id / Chunk by hash)
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_synclog_node_chunk_covering ON embeddings_synclog(node_id) INCLUDE (chunk_id, status, synced_at, verified_at);",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunk_hash_node_covering ON documents_chunk(hash) INCLUDE (node_id, expr_id);",
+            
+            # Full text search indexes on the trigger-maintained tsvector columns.
+            # Queries must filter on content_tsv / chunk_text_tsv (see
+            # LegalUnit.objects.search_content); to_tsvector(content) in a WHERE
+            # clause does not match this index and results in a seq scan.
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_legalunit_content_tsv_gin ON documents_legalunit USING gin(content_tsv);",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunk_text_tsv_gin ON documents_chunk USING gin(chunk_text_tsv);",
         ]
         
         return indexes
     
+    @staticmethod
+    def _index_name(index_sql: str) -> str:
+        """استخراج نام index از دستور CREATE INDEX"""
+        try:
+            return index_sql.split('IF NOT EXISTS')[1].split()[0]
+        except IndexError:
+            return index_sql[:60]
+    
+    @staticmethod
+    def apply_indexes(indexes=None, maintenance_work_mem: str = '1GB'):
+        """
+        اجرای دستورات CREATE INDEX CONCURRENTLY روی یک اتصال autocommit جداگانه.
+        
+        CONCURRENTLY داخل transaction block اجرا نمی‌شود؛ بنابراین به جای اتصال
+        Django (که ممکن است داخل atomic باشد) یک اتصال psycopg مستقل با
+        autocommit=True باز می‌شود و هر index به صورت جداگانه ساخته می‌شود.
+        پیشرفت هر build از جلسه دیگری با index_build_progress() قابل مشاهده است.
+        
+        Args:
+            indexes: لیست دستورات SQL (پیش‌فرض: add_missing_indexes())
+            maintenance_work_mem: حافظه برای ساخت index
+        
+        Returns:
+            لیست dict شامل name، duration و error برای هر index
+        """
+        import psycopg
+        from django.db import connections
+        
+        if indexes is None:
+            indexes = DatabaseOptimizations.add_missing_indexes()
+        
+        # همان پارامترهای اتصال Django: OPTIONS (sslmode، options، connect_timeout و ...)
+        # ادغام و کلیدهای مخصوص Django (isolation_level و ...) حذف می‌شوند
+        conn_params = connections['default'].get_connection_params()
+        
+        results = []
+        with psycopg.connect(autocommit=True, **conn_params) as conn:
+            for index_sql in indexes:
+                name = DatabaseOptimizations._index_name(index_sql)
+                start_time = time.time()
+                error = None
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute("SET statement_timeout = '0'")
+                        cur.execute(
+                            "SELECT set_config('maintenance_work_mem', %s, false)",
+                            [maintenance_work_mem]
+                        )
+                        logger.info(f"Building index {name}...")
+                        cur.execute(index_sql)
+                except Exception as e:
+                    error = str(e)
+                    logger.error(f"Failed to create index {name}: {e}")
+                duration = time.time() - start_time
+                if error is None:
+                    logger.info(f"Index {name} ready in {duration:.2f}s")
+                results.append({'name': name, 'duration': duration, 'error': error})
+        
+        return results
+    
+    @staticmethod
+    def index_build_progress():
+        """
+        وضعیت build های در حال اجرا از pg_stat_progress_create_index.
+        
+        Returns:
+            لیست dict شامل relation، index، phase و درصد blocks/tuples
+        """
+        from django.db import connection
+        
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT relid::regclass::text, index_relid::regclass::text, phase,
+                       blocks_done, blocks_total, tuples_done, tuples_total
+                FROM pg_stat_progress_create_index
+            """)
+            rows = cursor.fetchall()
+        
+        return [
+            {
+                'relation': rel,
+                'index': idx,
+                'phase': phase,
+                'blocks_pct': round(100.0 * bd / bt, 1) if bt else None,
+                'tuples_pct': round(100.0 * td / tt, 1) if tt else None,
+            }
+            for rel, idx, phase, bd, bt, td, tt in rows
+        ]
+    
+    @staticmethod
+    def _format_value_for_copy(value) -> str:
+        """تبدیل یک مقدار به فرمت text دستور COPY"""
+        if value is None:
+            return '\\N'
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value, ensure_ascii=False)
+        return (
+            str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r')
+        )
+    
+    @staticmethod
+    @contextmanager
+    def _write_transaction(async_commit: bool = False):
+        """
+        transaction + cursor برای نوشتن دسته‌ای.
+        
+        با async_commit=True دستور SET LOCAL synchronous_commit = OFF اجرا
+        می‌شود تا commit منتظر fsync شدن WAL نماند. فقط برای نوشتن‌های
+        idempotent (مثل وضعیت verification در SyncLog) که در اجرای بعدی
+        دوباره محاسبه می‌شوند استفاده شود؛ در صورت crash چند تراکنش آخر
+        ممکن است از دست برود.
+        """
+        from django.db import connection, transaction
+        
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                if async_commit and connection.vendor == 'postgresql':
+                    cursor.execute("SET LOCAL synchronous_commit = OFF")
+                yield cursor
+    
+    @staticmethod
+    def bulk_copy(table: str, columns, rows, page_size: int = 500, async_commit: bool = False) -> int:
+        """
+        درج دسته‌ای سطرها با COPY ... FROM STDIN (psycopg3).
+        
+        COPY چند برابر سریع‌تر از INSERT سطر به سطر یا executemany است.
+        روی psycopg2 به execute_values با page_size برمی‌گردد.
+        
+        Args:
+            table: نام جدول (مثلاً embeddings_synclog)
+            columns: لیست نام ستون‌ها
+            rows: iterable از tuple ها به ترتیب columns
+            page_size: اندازه صفحه برای execute_values (فقط psycopg2)
+            async_commit: commit بدون انتظار برای fsync (نگاه کنید به _write_transaction)
+        
+        Returns:
+            تعداد سطرهای نوشته شده
+        """
+        from django.db import connection
+        
+        columns = list(columns)
+        cols = ', '.join(columns)
+        count = 0
+        
+        connection.ensure_connection()
+        driver = connection.connection.__class__.__module__
+        
+        with DatabaseOptimizations._write_transaction(async_commit) as cursor:
+            if driver.startswith('psycopg2'):
+                from psycopg2.extras import execute_values
+                rows = list(rows)
+                execute_values(
+                    cursor.cursor, f"INSERT INTO {table} ({cols}) VALUES %s",
+                    rows, page_size=page_size
+                )
+                return len(rows)
+            
+            fmt = DatabaseOptimizations._format_value_for_copy
+            with cursor.cursor.copy(f"COPY {table} ({cols}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write('\t'.join(fmt(v) for v in row) + '\n')
+                    count += 1
+        
+        logger.info(f"COPY {count} rows into {table}")
+        return count
+    
+    @staticmethod
+    def fast_insert(model, rows, columns=None, page_size: int = 500, async_commit: bool = False) -> int:
+        """
+        درج دسته‌ای بدون round-trip به ازای هر سطر.
+        
+        psycopg2: execute_values با page_size سطر در هر INSERT.
+        psycopg3: executemany در pipeline mode؛ همه INSERT ها قبل از انتظار
+        برای پاسخ ارسال می‌شوند. (cursor جنگو ClientCursor است و پارامترها
+        سمت کلاینت bind می‌شوند، بنابراین prepared statement سروری ساخته نمی‌شود.)
+        
+        Args:
+            model: کلاس مدل Django (مثلاً SyncLog)
+            rows: لیست dict (کلید = نام ستون) یا tuple (به همراه columns)
+            columns: لیست نام ستون‌ها؛ در صورت None از کلیدهای اولین dict
+                (برای سطرهای tuple الزامی است)
+            page_size: تعداد سطر در هر صفحه (psycopg2)
+            async_commit: commit بدون انتظار برای fsync (نگاه کنید به _write_transaction)
+        
+        Returns:
+            تعداد سطرهای درج شده
+        """
+        from django.db import connection
+        
+        rows = list(rows)
+        if not rows:
+            return 0
+        
+        if isinstance(rows[0], dict):
+            if columns is None:
+                columns = list(rows[0].keys())
+            rows = [tuple(row[col] for col in columns) for row in rows]
+        elif columns is None:
+            raise ValueError("fast_insert: برای سطرهای tuple باید columns داده شود")
+        
+        qn = connection.ops.quote_name
+        table = qn(model._meta.db_table)
+        cols = ', '.join(qn(col) for col in columns)
+        
+        connection.ensure_connection()
+        raw_conn = connection.connection
+        driver = raw_conn.__class__.__module__
+        
+        with DatabaseOptimizations._write_transaction(async_commit) as cursor:
+            if connection.vendor == 'postgresql' and driver.startswith('psycopg2'):
+                from psycopg2.extras import execute_values
+                execute_values(
+                    cursor.cursor, f"INSERT INTO {table} ({cols}) VALUES %s",
+                    rows, page_size=page_size
+                )
+            elif connection.vendor == 'postgresql':
+                placeholders = ', '.join(['%s'] * len(columns))
+                sql = f"INSERT INTO {table} ({cols}) VALUES ({placeholders})"
+                with raw_conn.pipeline():
+                    cursor.cursor.executemany(sql, rows)
+            else:
+                placeholders = ', '.join(['%s'] * len(columns))
+                cursor.executemany(
+                    f"INSERT INTO {table} ({cols}) VALUES ({placeholders})", rows
+                )
+        
+        return len(rows)
+    
     @staticmethod
     def optimize_database_settings():
         """تنظیمات پیشنهادی برای PostgreSQL"""
@@ -222,24 +515,82 @@ class DatabaseOptimizations:
 class PerformanceMonitor:
     """مانیتورینگ عملکرد برنامه"""
     
+    @staticmethod
+    def _pg_stat_statements_totals(connection):
+        """مجموع calls و total_exec_time از pg_stat_statements (یا None)"""
+        if connection.vendor != 'postgresql':
+            return None
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT coalesce(sum(calls), 0), coalesce(sum(total_exec_time), 0)
+                    FROM pg_stat_statements
+                    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+                """)
+                return cursor.fetchone()
+        except Exception as e:
+            logger.debug(f"pg_stat_statements not available: {e}")
+            return None
+    
+    @staticmethod
+    @contextmanager
+    def measure(deep: bool = False, slowest: int = 5):
+        """
+        شمارش و زمان‌سنجی Query ها با connection.execute_wrapper.
+        
+        برخلاف connection.queries به DEBUG=True وابسته نیست و حافظه را در
+        worker های طولانی‌مدت پر نمی‌کند؛ فقط slowest کوئری کندتر نگه داشته می‌شود.
+        
+        Args:
+            deep: مقایسه pg_stat_statements قبل و بعد (زمان اجرای سمت سرور)
+            slowest: تعداد کوئری‌های کند برای نگهداری
+        
+        Yields:
+            dict شامل count، time (ثانیه)، slowest و در حالت deep، server_calls/server_time_ms
+        """
+        import heapq
+        from django.db import connection
+        
+        stats = {'count': 0, 'time': 0.0, 'slowest': []}
+        heap = []
+        
+        def counter_wrapper(execute, sql, params, many, context):
+            start = time.perf_counter_ns()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                elapsed = (time.perf_counter_ns() - start) / 1e9
+                stats['count'] += 1
+                stats['time'] += elapsed
+                if len(heap) < slowest:
+                    heapq.heappush(heap, (elapsed, sql))
+                elif elapsed > heap[0][0]:
+                    heapq.heapreplace(heap, (elapsed, sql))
+        
+        before = PerformanceMonitor._pg_stat_statements_totals(connection) if deep else None
+        try:
+            with connection.execute_wrapper(counter_wrapper):
+                yield stats
+        finally:
+            stats['slowest'] = sorted(heap, reverse=True)
+            if before is not None:
+                after = PerformanceMonitor._pg_stat_statements_totals(connection)
+                if after is not None:
+                    stats['server_calls'] = after[0] - before[0]
+                    stats['server_time_ms'] = float(after[1] - before[1])
+    
     @staticmethod
     def measure_query_time(func):
         """Decorator برای اندازه‌گیری زمان اجرای Query ها"""
         @wraps(func)
         def wrapper(*args, **kwargs):
-            from django.db import connection
-            from django.db.models import QuerySet
-            
-            initial_queries = len(connection.queries)
-            start_time = time.time()
+            start_time = time.perf_counter()
             
-            result = func(*args, **kwargs)
-            
-            end_time = time.time()
-            new_queries = connection.queries[initial_queries:]
+            with PerformanceMonitor.measure() as stats:
+                result = func(*args, **kwargs)
             
-            total_time = end_time - start_time
-            query_count = len(new_queries)
+            total_time = time.perf_counter() - start_time
+            query_count = stats['count']
             
             if query_count > 10 or total_time > 1.0:  # Log slow or complex queries
                 logger.warning(
@@ -248,15 +599,9 @@ class PerformanceMonitor:
                 )
                 
                 # Log slowest queries
-                slow_queries = sorted(
-                    new_queries, 
-                    key=lambda q: float(q['time']), 
-                    reverse=True
-                )[:5]
-                
-                for i, query in enumerate(slow_queries, 1):
+                for i, (duration, sql) in enumerate(stats['slowest'], 1):
                     logger.debug(
-                        f"Query {i}: {query['time']}s - {query['sql'][:200]}"
+                        f"Query {i}: {duration:.3f}s - {sql[:200]}"
                     )
             
             return result
@@ -293,42 +638,96 @@ class MemoryOptimizer:
     """بهینه‌سازی مصرف حافظه"""
     
     @staticmethod
-    def chunked_queryset(queryset, chunk_size=1000):
-        """پردازش QuerySet به صورت chunk برای کاهش مصرف RAM"""
-        start = 0
+    def chunked_queryset(queryset, chunk_size=1000, key='pk'):
+        """
+        پردازش QuerySet به صورت chunk برای کاهش مصرف RAM.
+        
+        از keyset pagination (WHERE key > last ORDER BY key LIMIT n) به جای
+        OFFSET/LIMIT استفاده می‌کند تا هزینه هر chunk مستقل از عمق باشد.
+        key باید یک فیلد یکتا باشد؛ ترتیب QuerySet ورودی با order_by(key)
+        جایگزین می‌شود.
+        
+        اگر keyset ممکن نباشد (key=None)، ردیف‌ها با queryset.iterator(chunk_size)
+        در یک اجرای SQL stream می‌شوند؛ روی PostgreSQL این کار با server-side
+        cursor انجام می‌شود و ترتیب QuerySet حفظ می‌شود. نیازمند
+        DISABLE_SERVER_SIDE_CURSORS=False (پیش‌فرض) است؛ پشت PgBouncer در حالت
+        transaction pooling، cursor فقط داخل transaction.atomic() معتبر است.
+        """
+        from django.db import reset_queries
+        
+        if key is None:
+            for count, item in enumerate(queryset.iterator(chunk_size=chunk_size), 1):
+                yield item
+                # Clear query cache periodically
+                if count % 5000 == 0:
+                    reset_queries()
+            return
+        
+        queryset = queryset.order_by(key)
+        reset_every = max(1, 5000 // chunk_size)
+        last_key = None
+        chunk_number = 0
+        
         while True:
-            chunk = queryset[start:start + chunk_size]
+            page = queryset if last_key is None else queryset.filter(**{f'{key}__gt': last_key})
+            chunk = list(page[:chunk_size])
             if not chunk:
                 break
             
-            for item in chunk:
-                yield item
+            yield from chunk
             
-            start += chunk_size
+            last_key = getattr(chunk[-1], key)
+            chunk_number += 1
             
             # Clear query cache periodically
-            if start % 5000 == 0:
-                from django.db import reset_queries
+            if chunk_number % reset_every == 0:
                 reset_queries()
     
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _serializer_field_names(serializer_class):
+        """نام فیلدهای مجاز serializer (از Meta.fields یا تعریف serializer)"""
+        meta_fields = getattr(getattr(serializer_class, 'Meta', None), 'fields', None)
+        if isinstance(meta_fields, (list, tuple)):
+            return frozenset(meta_fields)
+        return frozenset(serializer_class().fields.keys())
+    
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _build_optimized_serializer(serializer_class, fields):
+        """ساخت (و cache) زیرکلاس serializer با فیلدهای محدود"""
+        class OptimizedSerializer(serializer_class):
+            class Meta(serializer_class.Meta):
+                pass
+        
+        OptimizedSerializer.Meta.fields = list(fields)
+        OptimizedSerializer.__name__ = f"Optimized{serializer_class.__name__}"
+        return OptimizedSerializer
+    
     @staticmethod
     def optimize_serializer_fields(serializer_class, request):
-        """کاهش فیلدهای غیرضروری در Serializer بر اساس درخواست"""
+        """
+        کاهش فیلدهای غیرضروری در Serializer بر اساس درخواست.
+        
+        کلاس ساخته‌شده به ازای (serializer_class, fields) cache می‌شود؛ فیلدهای
+        درخواستی ابتدا با فیلدهای مجاز serializer اشتراک گرفته می‌شوند تا
+        ورودی کاربر باعث رشد نامحدود cache نشود.
+        """
         requested_fields = request.query_params.get('fields')
         if requested_fields:
-            requested_fields = requested_fields.split(',')
-            
-            class OptimizedSerializer(serializer_class):
-                class Meta(serializer_class.Meta):
-                    fields = requested_fields
-            
-            return OptimizedSerializer
+            allowed = MemoryOptimizer._serializer_field_names(serializer_class)
+            fields = tuple(sorted(
+                {f.strip() for f in requested_fields.split(',')} & allowed
+            ))
+            if fields:
+                return MemoryOptimizer._build_optimized_serializer(serializer_class, fields)
         
         return serializer_class
 
 
 # Export utility functions
 __all__ = [
+    'CACHE_SCHEMAS',
     'QueryOptimizer',
     'CacheStrategy',
     'DatabaseOptimizations',
@@ -0,0 +1,33 @@
+"""
+HTTP session مشترک برای درخواست‌های sync/verify/delete به Core.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_thread_local = threading.local()
+
+
+def core_http_session() -> requests.Session:
+    """
+    Session جداگانه برای هر thread (استفاده مجدد از اتصال keep-alive به Core).
+
+    خطاهای موقت gateway (502/503/504) برای درخواست‌های idempotent (GET/DELETE)
+    با backoff تکرار می‌شوند؛ POST های sync تکرار نمی‌شوند.
+    """
+    session = getattr(_thread_local, 'session', None)
+    if session is None:
+        session = _thread_local.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504],
+                raise_on_status=False,  # پس از آخرین تلاش، پاسخ HTTP مثل قبل برگردانده شود
+            ),
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+    return session
@@ -1,13 +1,90 @@
 """
 Core Node Verifier - بررسی و تایید نودها در Core/Qdrant
 """
+import asyncio
+import json
 import logging
 import requests
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Any, Optional, List, Tuple
 from django.conf import settings
 
+from ingest.core.optimizations import CacheStrategy
+from .http_session import core_http_session
+
+try:
+    import httpx
+except ImportError:  # httpx اختیاری است؛ در نبود آن از ThreadPoolExecutor استفاده می‌شود
+    httpx = None
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+# فیلدهایی که در verify_node / compare_with_local مقایسه می‌شوند
+_VERIFY_FIELDS = ('text', 'document_id', 'document_type', 'language')
+_COMPARE_FIELDS = ('text', 'document_id', 'document_type')
+_COMPARE_METADATA_FIELDS = ('work_title', 'path_label', 'jurisdiction', 'authority')
+
+# حداکثر طول متن نمایش‌داده‌شده در پیام عدم تطابق text
+_MISMATCH_TEXT_PREVIEW = 80
+
+
+def _parse_node_ids(node_ids) -> Tuple[Dict[str, str], Dict[str, Dict[str, Any]]]:
+    """
+    تبدیل یک‌باره node_id ها به UUID.
+    
+    Returns:
+        (valid, invalid): valid نگاشت node_id ورودی به شکل canonical آن؛
+        invalid نتیجه خطا برای node_id های نامعتبر (بدون درخواست به Core)
+    """
+    valid, invalid = {}, {}
+    for node_id in node_ids:
+        try:
+            valid[node_id] = str(node_id if isinstance(node_id, uuid.UUID) else uuid.UUID(node_id))
+        except (ValueError, TypeError, AttributeError):
+            invalid[node_id] = {
+                'exists': False,
+                'verified': False,
+                'error': 'node_id نامعتبر است'
+            }
+    return valid, invalid
+
+
+def _mismatch_message(key: str, got: Any, expected: Any) -> str:
+    """پیام عدم تطابق فیلد در verify_node، شامل مقدار دریافتی و مورد انتظار"""
+    if key != 'text':
+        return f"{key} مطابقت ندارد: {got} != {expected}"
+    
+    # متن‌ها طولانی‌اند؛ فقط ابتدای آن‌ها در پیام می‌آید
+    got, expected = (
+        v[:_MISMATCH_TEXT_PREVIEW] + '…' if isinstance(v, str) and len(v) > _MISMATCH_TEXT_PREVIEW else v
+        for v in (got, expected)
+    )
+    return f"متن با داده مورد انتظار مطابقت ندارد: {got!r} != {expected!r}"
+
+
+def _use_async_client() -> bool:
+    """
+    آیا مسیر httpx/asyncio قابل استفاده است؟
+    
+    asyncio.run داخل یک event loop در حال اجرا (مثلاً زیر ASGI) RuntimeError
+    می‌دهد؛ در آن حالت مسیر ThreadPoolExecutor استفاده می‌شود.
+    """
+    if httpx is None:
+        return False
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return True
+    return False
+
 
 class CoreNodeVerifier:
     """بررسی و تایید نودها در Core API"""
@@ -17,13 +94,22 @@ class CoreNodeVerifier:
         self.api_key = api_key
         self.headers = {'X-API-Key': self.api_key}
     
-    def get_node(self, node_id: str, timeout: int = 30) -> Optional[Dict[str, Any]]:
+    def get_node(
+        self,
+        node_id: str,
+        timeout: int = 30,
+        include_vector: bool = False,
+        include_text: bool = True
+    ) -> Optional[Dict[str, Any]]:
         """
         دریافت اطلاعات نود از Core.
         
         Args:
             node_id: UUID نود
             timeout: حداکثر زمان انتظار (ثانیه)
+            include_vector: آیا بردار هم دریافت شود؟ (پیش‌فرض خیر - حدود 6KB در هر نود)
+            include_text: آیا متن نود دریافت شود؟ (برای بررسی وجود لازم نیست و
+                Core می‌تواند کوئری خلاصه و آماده‌شده را اجرا کند)
             
         Returns:
             دیکشنری اطلاعات نود یا None در صورت خطا
@@ -31,14 +117,16 @@ class CoreNodeVerifier:
         try:
             url = f"{self.base_url}/api/v1/sync/node/{node_id}"
             
-            response = requests.get(
+            # session مشترک هر thread: اتصال keep-alive به Core دوباره استفاده می‌شود
+            response = core_http_session().get(
                 url,
                 headers=self.headers,
+                params={'include_vector': int(include_vector), 'include_text': int(include_text)},
                 timeout=timeout
             )
             
             if response.status_code == 200:
-                return response.json()
+                return _json_loads(response.content)
             elif response.status_code == 404:
                 logger.warning(f"Node {node_id} not found in Core")
                 return {'exists': False, 'node_id': node_id}
@@ -66,7 +154,7 @@ class CoreNodeVerifier:
         Returns:
             True اگر نود موجود باشد
         """
-        data = self.get_node(node_id)
+        data = self.get_node(node_id, include_text=False)
         return data is not None and data.get('exists', False)
     
     def verify_node(self, node_id: str, expected_data: Dict[str, Any]) -> Tuple[bool, List[str]]:
@@ -80,7 +168,7 @@ class CoreNodeVerifier:
         Returns:
             (is_valid, error_messages): (True/False, لیست خطاها)
         """
-        data = self.get_node(node_id)
+        data = self.get_node(node_id, include_vector=True)
         
         if data is None:
             return False, ["خطا در دریافت نود از Core"]
@@ -88,24 +176,12 @@ class CoreNodeVerifier:
         if not data.get('exists', False):
             return False, [f"نود {node_id} در Core یافت نشد"]
         
-        errors = []
-        
-        # بررسی فیلدهای مهم
-        if 'text' in expected_data:
-            if data.get('text') != expected_data['text']:
-                errors.append("متن با داده مورد انتظار مطابقت ندارد")
-        
-        if 'document_id' in expected_data:
-            if data.get('document_id') != expected_data['document_id']:
-                errors.append(f"document_id مطابقت ندارد: {data.get('document_id')} != {expected_data['document_id']}")
-        
-        if 'document_type' in expected_data:
-            if data.get('document_type') != expected_data['document_type']:
-                errors.append(f"document_type مطابقت ندارد")
-        
-        if 'language' in expected_data:
-            if data.get('language') != expected_data['language']:
-                errors.append(f"language مطابقت ندارد")
+        # بررسی فیلدهای مهم (یک pass روی لیست فیلدها)؛ پیام شامل مقدار دریافتی و مورد انتظار
+        errors = [
+            _mismatch_message(key, data.get(key), expected_data[key])
+            for key in _VERIFY_FIELDS
+            if key in expected_data and data.get(key) != expected_data[key]
+        ]
         
         # بررسی بردار
         vector = data.get('vector', [])
@@ -123,26 +199,33 @@ class CoreNodeVerifier:
     def verify_multiple_nodes(
         self, 
         node_ids: List[str], 
-        max_workers: int = 5
+        max_workers: int = 5,
+        concurrency: int = 64
     ) -> Dict[str, Dict[str, Any]]:
         """
         بررسی چندین نود به صورت همزمان.
         
+        در صورت نصب بودن httpx، درخواست‌ها به صورت async روی یک اتصال
+        HTTP/2 ارسال می‌شوند (averify_multiple_nodes)؛ در غیر این صورت، یا اگر
+        event loop در حال اجرا باشد، از ThreadPoolExecutor استفاده می‌شود.
+        
         Args:
             node_ids: لیست UUID های نود
-            max_workers: تعداد worker های همزمان
+            max_workers: تعداد worker های همزمان (فقط در حالت thread)
+            concurrency: حداکثر درخواست همزمان (فقط در حالت async)
             
         Returns:
             دیکشنری با node_id به عنوان کلید و نتیجه بررسی
         """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        if _use_async_client():
+            return asyncio.run(self.averify_multiple_nodes(node_ids, concurrency=concurrency))
         
-        results = {}
+        valid, results = _parse_node_ids(node_ids)
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_to_node = {
-                executor.submit(self.node_exists, node_id): node_id 
-                for node_id in node_ids
+                executor.submit(self.node_exists, canonical): node_id 
+                for node_id, canonical in valid.items()
             }
             
             for future in as_completed(future_to_node):
@@ -163,6 +246,73 @@ class CoreNodeVerifier:
         
         return results
     
+    async def averify_multiple_nodes(
+        self,
+        node_ids: List[str],
+        concurrency: int = 64,
+        timeout: int = 30
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        بررسی چندین نود با httpx.AsyncClient روی HTTP/2.
+        
+        همه درخواست‌ها روی یک اتصال multiplex می‌شوند و تعداد درخواست‌های
+        همزمان با Semaphore محدود می‌شود.
+        
+        Args:
+            node_ids: لیست UUID های نود
+            concurrency: حداکثر درخواست همزمان
+            timeout: حداکثر زمان انتظار هر درخواست (ثانیه)
+            
+        Returns:
+            دیکشنری با node_id به عنوان کلید و نتیجه بررسی
+        """
+        # node_id ها یک بار parse می‌شوند؛ موارد نامعتبر بدون درخواست رد می‌شوند
+        valid, invalid = _parse_node_ids(node_ids)
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async with httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            http2=True,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency)
+        ) as client:
+            
+            async def _verify(node_id: str, canonical: str) -> Tuple[str, Dict[str, Any]]:
+                try:
+                    async with semaphore:
+                        response = await client.get(
+                            f"/api/v1/sync/node/{canonical}",
+                            params={'include_vector': 0, 'include_text': 0}
+                        )
+                    
+                    if response.status_code == 200:
+                        exists = bool(_json_loads(response.content).get('exists', False))
+                    else:
+                        if response.status_code != 404:
+                            logger.error(f"Error getting node {node_id}: {response.status_code} - {response.text[:200]}")
+                        exists = False
+                    
+                    return node_id, {
+                        'exists': exists,
+                        'verified': exists,
+                        'error': None if exists else 'نود یافت نشد'
+                    }
+                except Exception as e:
+                    logger.error(f"Unexpected error getting node {node_id}: {e}")
+                    return node_id, {
+                        'exists': False,
+                        'verified': False,
+                        'error': str(e)
+                    }
+            
+            results = await asyncio.gather(
+                *(_verify(node_id, canonical) for node_id, canonical in valid.items())
+            )
+        
+        invalid.update(results)
+        return invalid
+    
     def get_node_metadata(self, node_id: str) -> Optional[Dict[str, Any]]:
         """
         دریافت فقط metadata نود (بدون بردار).
@@ -209,25 +359,21 @@ class CoreNodeVerifier:
         if not local_payload:
             return False, ["خطا در ساخت payload محلی"]
         
-        differences = []
-        
         # مقایسه فیلدها
-        if core_data.get('text') != local_payload.get('text'):
-            differences.append("متن متفاوت است")
-        
-        if core_data.get('document_id') != local_payload.get('document_id'):
-            differences.append("document_id متفاوت است")
-        
-        if core_data.get('document_type') != local_payload.get('document_type'):
-            differences.append("document_type متفاوت است")
+        differences = [
+            f"{key} متفاوت است"
+            for key in _COMPARE_FIELDS
+            if core_data.get(key) != local_payload.get(key)
+        ]
         
         # مقایسه metadata
         core_metadata = core_data.get('metadata', {})
         local_metadata = local_payload.get('metadata', {})
-        
-        for key in ['work_title', 'path_label', 'jurisdiction', 'authority']:
-            if core_metadata.get(key) != local_metadata.get(key):
-                differences.append(f"metadata.{key} متفاوت است")
+        differences.extend(
+            f"metadata.{key} متفاوت است"
+            for key in _COMPARE_METADATA_FIELDS
+            if core_metadata.get(key) != local_metadata.get(key)
+        )
         
         is_match = len(differences) == 0
         return is_match, differences
@@ -255,7 +401,7 @@ class CoreNodeDeleter:
         try:
             url = f"{self.base_url}/api/v1/sync/node/{node_id}"
             
-            response = requests.delete(
+            response = core_http_session().delete(
                 url,
                 headers=self.headers,
                 timeout=timeout
@@ -288,19 +434,25 @@ class CoreNodeDeleter:
     def delete_multiple_nodes(
         self, 
         node_ids: List[str], 
-        max_workers: int = 5
+        max_workers: int = 5,
+        concurrency: int = 64
     ) -> Dict[str, Dict[str, Any]]:
         """
         حذف چندین نود به صورت همزمان.
         
+        در صورت نصب بودن httpx (و نبود event loop در حال اجرا) از
+        adelete_multiple_nodes استفاده می‌شود.
+        
         Args:
             node_ids: لیست UUID های نود
-            max_workers: تعداد worker های همزمان
+            max_workers: تعداد worker های همزمان (فقط در حالت thread)
+            concurrency: حداکثر درخواست همزمان (فقط در حالت async)
             
         Returns:
             دیکشنری با node_id به عنوان کلید و نتیجه حذف
         """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        if _use_async_client():
+            return asyncio.run(self.adelete_multiple_nodes(node_ids, concurrency=concurrency))
         
         results = {}
         
@@ -325,13 +477,100 @@ class CoreNodeDeleter:
                     }
         
         return results
+    
+    async def adelete_multiple_nodes(
+        self,
+        node_ids: List[str],
+        concurrency: int = 64,
+        timeout: int = 30
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        حذف چندین نود با httpx.AsyncClient روی HTTP/2.
+        
+        Args:
+            node_ids: لیست UUID های نود
+            concurrency: حداکثر درخواست همزمان
+            timeout: حداکثر زمان انتظار هر درخواست (ثانیه)
+            
+        Returns:
+            دیکشنری با node_id به عنوان کلید و نتیجه حذف
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async with httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            http2=True,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency)
+        ) as client:
+            
+            async def _delete(node_id: str) -> Tuple[str, Dict[str, Any]]:
+                try:
+                    async with semaphore:
+                        response = await client.delete(f"/api/v1/sync/node/{node_id}")
+                    
+                    # اگر نود وجود نداشت (404)، موفق در نظر بگیر
+                    if response.status_code in (200, 404):
+                        return node_id, {'deleted': True, 'error': None}
+                    
+                    error_msg = f"HTTP {response.status_code}: {response.text[:200]}"
+                    logger.error(f"Error deleting node {node_id}: {error_msg}")
+                    return node_id, {'deleted': False, 'error': error_msg}
+                except Exception as e:
+                    error_msg = f"Unexpected error deleting node {node_id}: {e}"
+                    logger.error(error_msg)
+                    return node_id, {'deleted': False, 'error': error_msg}
+            
+            results = await asyncio.gather(*(_delete(node_id) for node_id in node_ids))
+        
+        return dict(results)
 
 
-def create_verifier_from_config():
-    """ساخت CoreNodeVerifier از تنظیمات CoreConfig"""
+@CacheStrategy.cache_result(
+    duration='long',
+    key_fn=lambda: CacheStrategy.key_for('core_config')
+)
+def _get_cached_core_config():
+    """خواندن CoreConfig از دیتابیس (با cache در Redis)"""
     from ingest.apps.embeddings.models import CoreConfig
     
-    config = CoreConfig.get_config()
+    return CoreConfig.get_config()
+
+
+# (expires_at, config): نسخه محلی CoreConfig در هر process
+_local_core_config = (0.0, None)
+
+
+def _load_core_config():
+    """
+    CoreConfig با cache کوتاه‌مدت در سطح process روی cache مشترک.
+    
+    ساخت verifier/deleter برای هر نود به Redis نمی‌رود. پس از
+    CORE_CONFIG_LOCAL_TTL ثانیه (پیش‌فرض 30) دوباره از cache مشترک خوانده
+    می‌شود تا تغییر config (مثلاً rotate کردن API key) در process های دیگر
+    هم اعمال شود؛ در process ذخیره‌کننده، signal post_save فوراً پاکش می‌کند.
+    """
+    global _local_core_config
+    
+    expires_at, config = _local_core_config
+    now = time.monotonic()
+    if config is None or now >= expires_at:
+        config = _get_cached_core_config()
+        ttl = getattr(settings, 'CORE_CONFIG_LOCAL_TTL', 30)
+        _local_core_config = (now + ttl, config)
+    return config
+
+
+def reset_core_config_cache():
+    """پاک کردن نسخه محلی CoreConfig (signal post_save)"""
+    global _local_core_config
+    _local_core_config = (0.0, None)
+
+
+def create_verifier_from_config():
+    """ساخت CoreNodeVerifier از تنظیمات CoreConfig"""
+    config = _load_core_config()
     
     return CoreNodeVerifier(
         base_url=config.core_api_url,
@@ -341,9 +580,7 @@ def create_verifier_from_config():
 
 def create_deleter_from_config():
     """ساخت CoreNodeDeleter از تنظیمات CoreConfig"""
-    from ingest.apps.embeddings.models import CoreConfig
-    
-    config = CoreConfig.get_config()
+    config = _load_core_config()
     
     return CoreNodeDeleter(
         base_url=config.core_api_url,
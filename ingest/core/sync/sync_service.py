@@ -3,22 +3,64 @@ Service for syncing embeddings to Core system.
 """
 import requests
 import logging
-from typing import List, Dict, Any
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.db import transaction
+from django.db.models import Count, Q
+from simple_history.utils import bulk_update_with_history
 
 from ingest.apps.embeddings.models import Embedding, CoreConfig
 from ingest.apps.embeddings.models_synclog import SyncLog, SyncStats
-from .payload_builder import build_summary_payload, calculate_metadata_hash
+from .http_session import core_http_session
+from .payload_builder import build_summary_payloads, calculate_metadata_hash, dumps_payload, loads_payload
 
 logger = logging.getLogger(__name__)
 
+# حداکثر تعداد node_id در هر درخواست verify دسته‌ای
+VERIFY_BULK_SIZE = 200
+
+# انتظار برای index شدن نودها در Core پس از sync (سقف کل و فاصله poll، ثانیه)
+CORE_INDEX_WAIT = 2.0
+CORE_INDEX_POLL_INTERVAL = 0.1
+
+# ستون‌های Embedding که ساخت payload و علامت‌گذاری sync/خطا واقعاً می‌خوانند؛
+# ستون‌های حجیم دیگر (مثل sync_error) برای batch های sync بارگذاری نمی‌شوند
+_SYNC_FIELDS = (
+    'id', 'content_type_id', 'object_id', 'vector', 'text_content',
+    'model_id', 'model_name', 'dim', 'created_at',
+    'metadata_hash', 'sync_retry_count',
+)
+
+
+def _bulk_update_deferred_with_history(model, objs, fields, batch_size=None):
+    """
+    bulk_update به همراه یک ردیف history برای هر شیء (مثل save() قبلی).
+    
+    اشیاء با only() بارگذاری شده‌اند و bulk_update_with_history برای هر فیلد
+    deferred هر شیء یک query جدا می‌زند؛ به جای آن سطرهای به‌روزشده یک بار
+    کامل خوانده و به bulk_history_create داده می‌شوند. باید داخل
+    transaction.atomic فراخوانی شود.
+    """
+    model.objects.bulk_update(objs, fields, batch_size=batch_size)
+    snapshot = list(model.objects.filter(pk__in=[obj.pk for obj in objs]))
+    model.history.bulk_history_create(snapshot, batch_size=batch_size, update=True)
+
 
 class CoreSyncService:
     """Service برای همگام‌سازی با Core."""
     
     def __init__(self):
         self.config = CoreConfig.get_config()
+        self._headers = {}
+        self._bulk_verify_supported = getattr(settings, 'CORE_BULK_VERIFY_ENABLED', False)
+        if self.config.core_api_key:
+            self._headers['X-API-Key'] = self.config.core_api_key
     
     def sync_new_embeddings(self, batch_size: int = None) -> Dict[str, Any]:
         """
@@ -36,29 +78,17 @@ class CoreSyncService:
         batch_size = batch_size or self.config.sync_batch_size
         
         # Get unsynced embeddings
-        # Note: prefetch_related removed because it causes errors with QAEntry
-        # which doesn't have unit_id field. Prefetching is done in payload_builder.
-        embeddings = Embedding.objects.filter(
+        # Note: اشیاء منبع (Chunk/QAEntry/TextEntry) در build_summary_payloads
+        # بر اساس content_type_id گروه‌بندی و با یک in_bulk برای هر نوع بارگذاری می‌شوند
+        # (load_payload_sources).
+        embeddings = list(Embedding.objects.filter(
             synced_to_core=False
-        ).select_related(
-            'content_type'
-        )[:batch_size]
+        ).only(*_SYNC_FIELDS)[:batch_size])
         
         if not embeddings:
             return {'status': 'nothing_to_sync', 'synced': 0}
         
-        # Build payloads
-        payloads = []
-        embedding_map = {}  # embedding.id -> embedding
-        
-        for emb in embeddings:
-            payload = build_summary_payload(emb)
-            if payload:
-                payloads.append(payload)
-                embedding_map[str(emb.id)] = emb
-                
-                # Calculate and store metadata hash
-                emb.metadata_hash = calculate_metadata_hash(payload)
+        payloads, embedding_map = self._build_new_payloads(embeddings)
         
         if not payloads:
             return {'status': 'error', 'message': 'Failed to build any payloads'}
@@ -67,31 +97,7 @@ class CoreSyncService:
         result = self._send_to_core(payloads)
         
         if result['success']:
-            # Mark as synced
-            now = timezone.now()
-            
-            with transaction.atomic():
-                for payload in payloads:
-                    emb_id = payload['id']
-                    if emb_id in embedding_map:
-                        emb = embedding_map[emb_id]
-                        emb.synced_to_core = True
-                        emb.synced_at = now
-                        emb.last_metadata_sync = now
-                        emb.sync_error = ''
-                        emb.sync_retry_count = 0
-                        emb.save(update_fields=[
-                            'synced_to_core', 'synced_at', 'last_metadata_sync',
-                            'sync_error', 'sync_retry_count', 'metadata_hash',
-                            'updated_at'
-                        ])
-                
-                # Update config stats
-                self.config.last_successful_sync = now
-                self.config.total_synced += len(payloads)
-                self.config.last_sync_error = ''
-                self.config.save()
-                
+            self._mark_synced(embedding_map)
             # SyncLog will be created by _save_sync_logs if Core returns node_ids
             
             logger.info(f"Successfully synced {len(payloads)} embeddings")
@@ -101,20 +107,7 @@ class CoreSyncService:
                 'timestamp': timezone.now().isoformat()
             }
         else:
-            # Mark with error
-            with transaction.atomic():
-                for payload in payloads:
-                    emb_id = payload['id']
-                    if emb_id in embedding_map:
-                        emb = embedding_map[emb_id]
-                        emb.sync_error = result.get('error', 'Unknown error')[:500]
-                        emb.sync_retry_count += 1
-                        emb.save(update_fields=['sync_error', 'sync_retry_count', 'updated_at'])
-                
-                # Update config
-                self.config.total_errors += 1
-                self.config.last_sync_error = result.get('error', 'Unknown error')[:500]
-                self.config.save()
+            self._mark_failed(embedding_map, result.get('error', 'Unknown error'))
             
             logger.error(f"Failed to sync embeddings: {result.get('error')}")
             return {
@@ -123,6 +116,78 @@ class CoreSyncService:
                 'timestamp': timezone.now().isoformat()
             }
     
+    def _build_new_payloads(self, embeddings) -> Tuple[List[Dict[str, Any]], Dict[str, Embedding]]:
+        """
+        ساخت payload و metadata_hash برای یک batch.
+        
+        Returns:
+            (payloads, embedding_map) که embedding_map از embedding.id به Embedding است
+        """
+        payloads = []
+        embedding_map = {}  # embedding.id -> embedding
+        
+        for emb, payload in build_summary_payloads(embeddings):
+            if payload:
+                payloads.append(payload)
+                embedding_map[str(emb.id)] = emb
+                
+                # Calculate and store metadata hash
+                emb.metadata_hash = calculate_metadata_hash(payload)
+        
+        return payloads, embedding_map
+    
+    def _mark_synced(self, embedding_map: Dict[str, Embedding]):
+        """
+        علامت‌گذاری embedding های یک batch موفق و به‌روزرسانی آمار config.
+        
+        embedding_map دقیقاً embedding هایی است که payload آنها ارسال شده؛
+        پس نیازی به نگه داشتن خود payload ها (و بردارشان) تا این مرحله نیست.
+        """
+        now = timezone.now()
+        embeddings = list(embedding_map.values())
+        for emb in embeddings:
+            emb.synced_to_core = True
+            emb.synced_at = now
+            emb.last_metadata_sync = now
+            emb.sync_error = ''
+            emb.sync_retry_count = 0
+            emb.synced_metadata_hash = emb.metadata_hash
+            emb.updated_at = now  # bulk_update فیلد auto_now را تنظیم نمی‌کند
+        
+        with transaction.atomic():
+            # مثل save() قبلی برای هر تغییر وضعیت یک ردیف HistoricalEmbedding ثبت می‌شود
+            _bulk_update_deferred_with_history(Embedding, embeddings, [
+                'synced_to_core', 'synced_at', 'last_metadata_sync',
+                'sync_error', 'sync_retry_count', 'metadata_hash',
+                'synced_metadata_hash', 'updated_at'
+            ], batch_size=self.config.sync_batch_size)
+            
+            # Update config stats
+            self.config.last_successful_sync = now
+            self.config.total_synced += len(embedding_map)
+            self.config.last_sync_error = ''
+            self.config.save()
+    
+    def _mark_failed(self, embedding_map: Dict[str, Embedding], error: str):
+        """ثبت خطا روی embedding های یک batch ناموفق."""
+        now = timezone.now()
+        embeddings = list(embedding_map.values())
+        for emb in embeddings:
+            emb.sync_error = error[:500]
+            emb.sync_retry_count += 1
+            emb.updated_at = now
+        
+        with transaction.atomic():
+            _bulk_update_deferred_with_history(
+                Embedding, embeddings, ['sync_error', 'sync_retry_count', 'updated_at'],
+                batch_size=self.config.sync_batch_size
+            )
+            
+            # Update config
+            self.config.total_errors += 1
+            self.config.last_sync_error = error[:500]
+            self.config.save()
+    
     def sync_changed_metadata(self, batch_size: int = None) -> Dict[str, Any]:
         """
         Sync embeddings که metadata آنها تغییر کرده است.
@@ -133,7 +198,6 @@ class CoreSyncService:
         batch_size = batch_size or self.config.sync_batch_size
         
         # Get embeddings that need metadata resync
-        # Note: prefetch_related removed because it causes errors with QAEntry
         embeddings = Embedding.objects.filter(
             synced_to_core=True,
             metadata_hash=''  # Only get embeddings with invalidated metadata
@@ -143,33 +207,50 @@ class CoreSyncService:
         
         # Check which ones have changed metadata
         changed_embeddings = []
+        unchanged_embeddings = []
         payloads = []
         
-        for emb in embeddings:
-            payload = build_summary_payload(emb)
+        for emb, payload in build_summary_payloads(embeddings):
             if payload:
                 current_hash = calculate_metadata_hash(payload)
-                if current_hash != emb.metadata_hash:
+                emb.metadata_hash = current_hash
+                if current_hash == emb.synced_metadata_hash:
+                    # Core همین metadata را دارد؛ فقط علامت invalidate برداشته می‌شود
+                    unchanged_embeddings.append(emb)
+                else:
                     changed_embeddings.append(emb)
                     payloads.append(payload)
-                    emb.metadata_hash = current_hash
+        
+        if unchanged_embeddings:
+            bulk_update_with_history(unchanged_embeddings, Embedding, ['metadata_hash'])
         
         if not payloads:
-            return {'status': 'nothing_to_sync', 'changed': 0}
+            return {
+                'status': 'nothing_to_sync',
+                'changed': 0,
+                'unchanged': len(unchanged_embeddings)
+            }
         
         # Send to Core
         result = self._send_to_core(payloads)
         
         if result['success']:
+            now = timezone.now()
+            for emb in changed_embeddings:
+                emb.last_metadata_sync = now
+                emb.synced_metadata_hash = emb.metadata_hash
+                emb.updated_at = now
+            
             with transaction.atomic():
-                for emb in changed_embeddings:
-                    emb.last_metadata_sync = timezone.now()
-                    emb.save(update_fields=['metadata_hash', 'last_metadata_sync', 'updated_at'])
+                bulk_update_with_history(changed_embeddings, Embedding, [
+                    'metadata_hash', 'synced_metadata_hash', 'last_metadata_sync', 'updated_at'
+                ], batch_size=batch_size)
             
             logger.info(f"Successfully resynced {len(payloads)} changed embeddings")
             return {
                 'status': 'success',
                 'changed': len(payloads),
+                'unchanged': len(unchanged_embeddings),
                 'timestamp': timezone.now().isoformat()
             }
         else:
@@ -193,19 +274,10 @@ class CoreSyncService:
         )
         
         # Sync in batches
-        total_synced = 0
-        total_errors = 0
-        
-        while True:
-            result = self.sync_new_embeddings()
-            
-            if result['status'] == 'nothing_to_sync':
-                break
-            elif result['status'] == 'success':
-                total_synced += result['synced']
-            else:
-                total_errors += 1
-                break
+        if self.config.is_active and self.config.auto_sync_enabled:
+            total_synced, total_errors = self._sync_pipelined()
+        else:
+            total_synced, total_errors = 0, 1
         
         # Create SyncStats snapshot
         self._create_sync_stats()
@@ -217,39 +289,144 @@ class CoreSyncService:
             'timestamp': timezone.now().isoformat()
         }
     
+    def sync_pending_embeddings(self, batch_size: int = None) -> Dict[str, Any]:
+        """
+        ارسال همه embedding های sync نشده (بدون reset) با pipeline دسته‌ای.
+        
+        Returns:
+            Dict با نتیجه sync
+        """
+        if not self.config.is_active:
+            return {'status': 'disabled', 'message': 'Core sync is disabled'}
+        
+        if not self.config.auto_sync_enabled:
+            return {'status': 'disabled', 'message': 'Auto sync is disabled'}
+        
+        total_synced, total_errors = self._sync_pipelined(batch_size)
+        return {
+            'status': 'error' if total_errors else 'success',
+            'total_synced': total_synced,
+            'total_errors': total_errors,
+            'timestamp': timezone.now().isoformat()
+        }
+    
+    def _sync_pipelined(self, batch_size: int = None) -> Tuple[int, int]:
+        """
+        ارسال همه embedding های sync نشده با همپوشانی ساخت payload و HTTP.
+        
+        thread اصلی batch بعدی را از DB می‌سازد در حالی که تا CORE_SYNC_WORKERS
+        درخواست قبلی در thread pool در حال ارسال‌اند. کار با DB (ساخت payload،
+        SyncLog و علامت‌گذاری synced) فقط در thread اصلی انجام می‌شود و
+        worker ها فقط HTTP انجام می‌دهند. با اولین خطا batch جدیدی ارسال نمی‌شود.
+        
+        Returns:
+            (total_synced, total_errors)
+        """
+        batch_size = batch_size or self.config.sync_batch_size
+        max_workers = max(1, getattr(settings, 'CORE_SYNC_WORKERS', 4))
+        
+        id_batches = self._unsynced_id_batches(batch_size)
+        
+        total_synced = 0
+        total_errors = 0
+        failed = False
+        pending = []
+        
+        def drain_oldest():
+            nonlocal total_synced, total_errors, failed
+            future, embedding_map = pending.pop(0)
+            result = future.result()
+            if result['success']:
+                self._save_core_response(list(embedding_map), result['response'])
+                self._mark_synced(embedding_map)
+                total_synced += len(embedding_map)
+            else:
+                self._mark_failed(embedding_map, result.get('error', 'Unknown error'))
+                logger.error(f"Failed to sync embeddings: {result.get('error')}")
+                total_errors += 1
+                failed = True
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while not failed:
+                batch_ids = next(id_batches, None)
+                if batch_ids is None:
+                    break
+                
+                embeddings = Embedding.objects.filter(
+                    id__in=batch_ids
+                ).only(*_SYNC_FIELDS)
+                payloads, embedding_map = self._build_new_payloads(embeddings)
+                if not payloads:
+                    total_errors += 1
+                    continue
+                
+                # فقط embedding_map نگه داشته می‌شود؛ payload ها (و بردارها)
+                # پس از ارسال توسط worker آزاد می‌شوند
+                pending.append((executor.submit(self._post_to_core, payloads), embedding_map))
+                if len(pending) >= max_workers:
+                    drain_oldest()
+            
+            while pending:
+                drain_oldest()
+        
+        logger.info(f"Full sync finished: {total_synced} synced, {total_errors} errors")
+        return total_synced, total_errors
+    
+    @staticmethod
+    def _unsynced_id_batches(batch_size: int):
+        """
+        شناسه embedding های sync نشده به صورت batch با صفحه‌بندی keyset.
+        
+        هر batch یک اسکن بازه‌ای روی PK است (id > آخرین id) بدون OFFSET و
+        بدون server-side cursor باز. چون synced_to_core تا پایان ارسال batch
+        تغییر نمی‌کند، پیشروی بر اساس id است نه فیلتر دوباره روی وضعیت.
+        """
+        queryset = Embedding.objects.filter(synced_to_core=False).order_by('id')
+        last_id = None
+        while True:
+            page = queryset if last_id is None else queryset.filter(id__gt=last_id)
+            ids = list(page.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return
+            yield ids
+            last_id = ids[-1]
+    
     def _send_to_core(self, payloads: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        ارسال payloads به Core API.
+        ارسال payloads به Core API و ذخیره node_ids در SyncLog.
+        """
+        result = self._post_to_core(payloads)
+        if result['success']:
+            self._save_core_response([p['id'] for p in payloads], result['response'])
+        return result
+    
+    def _save_core_response(self, embedding_ids: List[str], response: Dict[str, Any]):
+        """ذخیره node_ids پاسخ Core در SyncLog (به ترتیب embedding_ids ارسال‌شده)."""
+        if 'node_ids' in response:
+            self._save_sync_logs(embedding_ids, response['node_ids'], response.get('timestamp'))
+        else:
+            # اگر Core node_ids برنگرداند، از embedding.id به عنوان node_id استفاده می‌کنیم
+            self._save_sync_logs(embedding_ids, embedding_ids, response.get('timestamp'))
+    
+    def _post_to_core(self, payloads: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        ارسال HTTP payloads به Core API (بدون دسترسی به DB؛ قابل اجرا در thread pool).
         """
         try:
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            if self.config.core_api_key:
-                headers['X-API-Key'] = self.config.core_api_key
-            
             url = f"{self.config.core_api_url}/api/v1/sync/embeddings"
             
-            response = requests.post(
+            response = core_http_session().post(
                 url,
-                json={
+                data=dumps_payload({
                     'embeddings': payloads,
                     'sync_type': 'incremental'
-                },
-                headers=headers,
+                }),
+                headers={**self._headers, 'Content-Type': 'application/json'},
                 timeout=60
             )
             
             if response.status_code == 200:
-                result = response.json()
-                # Save node_ids to SyncLog
-                if 'node_ids' in result:
-                    self._save_sync_logs(payloads, result['node_ids'], result.get('timestamp'))
-                else:
-                    # اگر Core node_ids برنگرداند، از embedding.id به عنوان node_id استفاده می‌کنیم
-                    node_ids = [p['id'] for p in payloads]
-                    self._save_sync_logs(payloads, node_ids, result.get('timestamp'))
-                return {'success': True, 'response': result}
+                return {'success': True, 'response': loads_payload(response.content)}
             else:
                 return {
                     'success': False,
@@ -263,43 +440,70 @@ class CoreSyncService:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def _save_sync_logs(self, payloads: List[Dict], node_ids: List[str], timestamp: str = None):
-        """ذخیره node_ids در SyncLog."""
+    def _save_sync_logs(self, embedding_ids: List[str], node_ids: List[str], timestamp: str = None):
+        """
+        ذخیره node_ids در SyncLog.
+        
+        Embedding ها و Chunk ها هر کدام با یک کوئری خوانده می‌شوند و node_id
+        چانک‌ها و SyncLog ها به صورت دسته‌ای نوشته می‌شوند.
+        """
         try:
             from ingest.apps.documents.models import Chunk
             
-            for payload, node_id in zip(payloads, node_ids):
-                embedding_id = payload.get('id')
-                
-                if not embedding_id or not node_id:
+            pairs = [
+                (embedding_id, node_id)
+                for embedding_id, node_id in zip(embedding_ids, node_ids)
+                if embedding_id and node_id
+            ]
+            
+            embeddings = Embedding.objects.only(
+                'id', 'content_type_id', 'object_id'
+            ).order_by().in_bulk([embedding_id for embedding_id, _ in pairs])
+            chunk_ct_id = ContentType.objects.get_for_model(Chunk).id
+            chunks = Chunk.objects.only('id', 'node_id').order_by().in_bulk([
+                emb.object_id for emb in embeddings.values()
+                if emb.content_type_id == chunk_ct_id
+            ])
+            
+            # زمان sync یک بار parse می‌شود (مانند SyncLog.create_sync_log)
+            synced_at = parse_datetime(timestamp) if isinstance(timestamp, str) else timestamp
+            synced_at = synced_at or timezone.now()
+            
+            updated_chunks = []
+            sync_logs = []
+            for embedding_id, node_id in pairs:
+                embedding = embeddings.get(uuid.UUID(str(embedding_id)))
+                if embedding is None:
+                    logger.warning(f"Embedding {embedding_id} not found")
                     continue
                 
-                # پیدا کردن Embedding و Chunk مربوطه
-                try:
-                    embedding = Embedding.objects.get(id=embedding_id)
-                    chunk = embedding.content_object
-                    
-                    # فقط Chunk را پردازش می‌کنیم
-                    if isinstance(chunk, Chunk):
-                        # به‌روزرسانی node_id در Chunk
-                        if not chunk.node_id:
-                            chunk.node_id = node_id
-                            chunk.save(update_fields=['node_id'])
-                        
-                        # ایجاد SyncLog
-                        SyncLog.create_sync_log(
-                            node_id=node_id,
-                            chunk=chunk,
-                            synced_at=timestamp
-                        )
-                    else:
-                        logger.warning(f"Embedding {embedding_id} is not linked to a Chunk")
-                        
-                except Embedding.DoesNotExist:
-                    logger.warning(f"Embedding {embedding_id} not found")
+                # فقط Chunk را پردازش می‌کنیم
+                chunk = chunks.get(embedding.object_id) if embedding.content_type_id == chunk_ct_id else None
+                if chunk is None:
+                    logger.warning(f"Embedding {embedding_id} is not linked to a Chunk")
                     continue
-                    
-            logger.info(f"Saved {len(node_ids)} sync logs")
+                
+                node_uuid = node_id if isinstance(node_id, uuid.UUID) else uuid.UUID(str(node_id))
+                
+                # به‌روزرسانی node_id در Chunk
+                if not chunk.node_id:
+                    chunk.node_id = node_uuid
+                    updated_chunks.append(chunk)
+                
+                sync_logs.append(SyncLog(
+                    node_id=node_uuid,
+                    chunk=chunk,
+                    synced_at=synced_at,
+                    status='synced'
+                ))
+            
+            with transaction.atomic():
+                if updated_chunks:
+                    # Chunk دارای HistoricalRecords است؛ مثل save() قبلی ردیف history ثبت می‌شود
+                    _bulk_update_deferred_with_history(Chunk, updated_chunks, ['node_id'], batch_size=500)
+                SyncLog.objects.bulk_create(sync_logs, batch_size=500)
+            
+            logger.info(f"Saved {len(sync_logs)} sync logs")
         except Exception as e:
             logger.error(f"Error saving sync logs: {e}")
     
@@ -315,14 +519,10 @@ class CoreSyncService:
         """
         try:
             url = f"{self.config.core_api_url}/api/v1/sync/node/{node_id}"
-            headers = {}
-            if self.config.core_api_key:
-                headers['X-API-Key'] = self.config.core_api_key
-            
-            response = requests.get(url, headers=headers, timeout=30)
+            response = core_http_session().get(url, headers=self._headers, timeout=30)
             
             if response.status_code == 200:
-                result = response.json()
+                result = loads_payload(response.content)
                 # Core API returns {'status': 'success', 'node': {...}}
                 if result.get('status') == 'success' and 'node' in result:
                     return {
@@ -344,6 +544,52 @@ class CoreSyncService:
         except Exception as e:
             return {'exists': False, 'node_id': node_id, 'error': str(e)}
     
+    def verify_nodes_bulk(self, node_ids: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        بررسی چند نود در Core با یک درخواست (POST /api/v1/sync/verify_batch).
+        
+        Args:
+            node_ids: لیست UUID نودها
+            
+        Returns:
+            Dict از node_id به نتیجه (ساختار verify_node_in_core)، یا None اگر
+            Core این endpoint را ندارد (404/405)
+        """
+        try:
+            url = f"{self.config.core_api_url}/api/v1/sync/verify_batch"
+            response = core_http_session().post(
+                url,
+                data=dumps_payload({'node_ids': node_ids}),
+                headers={**self._headers, 'Content-Type': 'application/json'},
+                timeout=60
+            )
+            
+            if response.status_code in (404, 405):
+                return None
+            if response.status_code != 200:
+                error = f'HTTP {response.status_code}'
+                return {node_id: {'exists': False, 'node_id': node_id, 'error': error} for node_id in node_ids}
+            
+            results = {}
+            for item in loads_payload(response.content).get('results', []):
+                node_id = str(item.get('node_id'))
+                result = {'exists': bool(item.get('exists')), 'node_id': node_id}
+                if item.get('error'):
+                    result['error'] = item['error']
+                results[node_id] = result
+            # نودهایی که در پاسخ نیامده‌اند، یافت‌نشده حساب می‌شوند
+            for node_id in node_ids:
+                results.setdefault(node_id, {'exists': False, 'node_id': node_id})
+            return results
+            
+        except requests.exceptions.Timeout:
+            error = 'Timeout'
+        except requests.exceptions.ConnectionError:
+            error = 'Connection error'
+        except Exception as e:
+            error = str(e)
+        return {node_id: {'exists': False, 'node_id': node_id, 'error': error} for node_id in node_ids}
+    
     def verify_and_update_log(self, sync_log: SyncLog, max_retries: int = 3) -> bool:
         """
         بررسی و به‌روزرسانی sync_log.
@@ -356,7 +602,10 @@ class CoreSyncService:
             True اگر verification موفق بود
         """
         result = self.verify_node_in_core(str(sync_log.node_id))
-        
+        return self._apply_verification(sync_log, result, max_retries)
+    
+    def _apply_verification(self, sync_log: SyncLog, result: Dict[str, Any], max_retries: int) -> bool:
+        """ثبت نتیجه verify_node_in_core روی sync_log (دسترسی به DB)."""
         if result.get('exists'):
             sync_log.mark_verified(core_response=result)
             logger.info(f"Verified node {sync_log.node_id}")
@@ -384,20 +633,18 @@ class CoreSyncService:
         Returns:
             Dict با آمار verification
         """
-        unverified_logs = SyncLog.get_unverified_logs(limit=batch_size)
+        unverified_logs = list(SyncLog.get_unverified_logs(limit=batch_size))
         
         verified_count = 0
         failed_count = 0
         
-        for sync_log in unverified_logs:
-            if self.verify_and_update_log(sync_log, max_retries):
-                verified_count += 1
-            else:
-                failed_count += 1
-            
-            # کمی صبر کن تا Core overload نشود
-            import time
-            time.sleep(0.1)
+        for start in range(0, len(unverified_logs), VERIFY_BULK_SIZE):
+            logs = unverified_logs[start:start + VERIFY_BULK_SIZE]
+            for sync_log, result in zip(logs, self._verify_logs(logs)):
+                if self._apply_verification(sync_log, result, max_retries):
+                    verified_count += 1
+                else:
+                    failed_count += 1
         
         return {
             'total': len(unverified_logs),
@@ -405,6 +652,27 @@ class CoreSyncService:
             'failed': failed_count
         }
     
+    def _verify_logs(self, logs: List[SyncLog]) -> List[Dict[str, Any]]:
+        """
+        نتیجه verification برای لیستی از SyncLog ها (به همان ترتیب).
+        
+        با CORE_BULK_VERIFY_ENABLED ابتدا endpoint دسته‌ای Core امتحان می‌شود؛
+        در غیر این صورت (یا اگر Core آن را نداشته باشد) درخواست‌های تکی با
+        همزمانی محدود (CORE_SYNC_WORKERS) ارسال می‌شوند.
+        """
+        node_ids = [str(sync_log.node_id) for sync_log in logs]
+        
+        if self._bulk_verify_supported:
+            results = self.verify_nodes_bulk(node_ids)
+            if results is not None:
+                return [results[node_id] for node_id in node_ids]
+            logger.info("Core has no bulk verify endpoint; falling back to per-node requests")
+            self._bulk_verify_supported = False
+        
+        max_workers = max(1, getattr(settings, 'CORE_SYNC_WORKERS', 4))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.verify_node_in_core, node_ids))
+    
     def sync_with_verification(self, batch_size: int = None, verify_after_sync: bool = True) -> Dict[str, Any]:
         """
         ارسال embeddings به Core و بررسی آنها.
@@ -431,9 +699,8 @@ class CoreSyncService:
         
         # 2. Verification (اختیاری)
         if verify_after_sync and sync_result.get('synced', 0) > 0:
-            # کمی صبر کن تا Core نودها را index کند
-            import time
-            time.sleep(2)
+            # صبر تا Core نودها را index کند (حداکثر CORE_INDEX_WAIT ثانیه)
+            self._wait_for_core_index()
             
             verify_result = self.verify_batch(batch_size=sync_result.get('synced', 0))
             result['verified_count'] = verify_result['verified']
@@ -441,16 +708,52 @@ class CoreSyncService:
         
         return result
     
+    def _wait_for_core_index(self) -> bool:
+        """
+        poll کوتاه روی آخرین نود sync شده به جای انتظار ثابت.
+        
+        نودهای یک batch با هم index می‌شوند؛ به محض دیده شدن آخرین نود در Core
+        verification شروع می‌شود و در بدترین حالت مانند قبل CORE_INDEX_WAIT صبر می‌شود.
+        
+        Returns:
+            True اگر نود پیش از پایان مهلت در Core دیده شد
+        """
+        node_id = SyncLog.objects.filter(status='synced').order_by(
+            '-synced_at'
+        ).values_list('node_id', flat=True).first()
+        if node_id is None:
+            return False
+        
+        deadline = time.monotonic() + CORE_INDEX_WAIT
+        while True:
+            if self.verify_node_in_core(str(node_id)).get('exists'):
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(CORE_INDEX_POLL_INTERVAL, remaining))
+    
     def _create_sync_stats(self):
         """ایجاد snapshot آمار sync برای monitoring."""
         try:
-            total = Embedding.objects.count()
-            synced = Embedding.objects.filter(synced_to_core=True).count()
+            # یک کوئری aggregate برای هر جدول به جای شش COUNT جداگانه
+            emb_stats = Embedding.objects.aggregate(
+                total=Count('id'),
+                synced=Count('id', filter=Q(synced_to_core=True)),
+            )
+            log_stats = SyncLog.objects.aggregate(
+                synced=Count('id', filter=Q(status='synced')),
+                verified=Count('id', filter=Q(status='verified')),
+                failed=Count('id', filter=Q(status='failed')),
+                pending=Count('id', filter=Q(status='pending')),
+            )
             
-            synced_logs = SyncLog.objects.filter(status='synced').count()
-            verified_logs = SyncLog.objects.filter(status='verified').count()
-            failed_logs = SyncLog.objects.filter(status='failed').count()
-            pending_logs = SyncLog.objects.filter(status='pending').count()
+            total = emb_stats['total']
+            synced = emb_stats['synced']
+            synced_logs = log_stats['synced']
+            verified_logs = log_stats['verified']
+            failed_logs = log_stats['failed']
+            pending_logs = log_stats['pending']
             
             sync_pct = round((synced / total * 100) if total > 0 else 0, 2)
             verify_pct = round((verified_logs / synced_logs * 100) if synced_logs > 0 else 0, 2)
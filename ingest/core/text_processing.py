@@ -2,46 +2,168 @@
 Text processing utilities for Persian text normalization.
 """
 import logging
-from typing import Optional
+import re
+import threading
+from functools import lru_cache
+from typing import Iterable, List, Optional
+from unicodedata import is_normalized as _unorm_is_normalized, normalize as _unorm
+
+import numpy as _np
 
 logger = logging.getLogger(__name__)
 
-class TextNormalizer:
-    """Persian text normalizer using hazm library."""
+# جفت‌های جایگزینی کاراکتر. str.replace (جستجوی C روی بافر) روی متن فارسی
+# ده‌ها برابر سریع‌تر از str.translate با جدول dict است که برای هر کاراکتر
+# غیر ASCII یک lookup پایتونی انجام می‌دهد؛ جفت‌هایی که در متن نیستند رد می‌شوند.
+# Note: We do NOT normalize ئ because it's used in words like مسئول
+_HAMZA_PAIRS = (
+    ('أ', 'ا'),  # Alef with hamza above → Alef
+    ('إ', 'ا'),  # Alef with hamza below → Alef
+    ('ؤ', 'و'),  # Waw with hamza above → Waw
+    ('ء', ''),   # Standalone hamza → remove
+)
+
+# Persian and Arabic-Indic digits → English digits
+_DIGIT_PAIRS = tuple(zip('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩', '01234567890123456789'))
+
+# Basic Persian character normalization (used when hazm is unavailable).
+# ارقام و همزه جدا نگه داشته شده‌اند تا مسیر fallback که آن‌ها را قبلاً
+# اعمال کرده، فقط همین جفت‌ها را دوباره اجرا کند
+_BASIC_CHAR_PAIRS = (
+    ('ي', 'ی'),       # Arabic yeh to Persian yeh
+    ('ك', 'ک'),       # Arabic kaf to Persian kaf
+    ('\u200c', ' '),  # Replace ZWNJ with space
+    ('\u200d', ' '),  # Replace ZWJ with space
+    ('\u200e', ''),   # Remove LTR mark
+    ('\u200f', ''),   # Remove RTL mark
+)
+_BASIC_PAIRS = _BASIC_CHAR_PAIRS + (
+    ('ء', ''),        # Remove hamza
+) + _DIGIT_PAIRS  # Persian/Arabic numbers to English
+
+# پاک‌سازی نهایی متن embedding: ZWNJ/ZWJ → فاصله، حذف کاراکترهای کنترلی
+_JOINER_PAIRS = (('\u200c', ' '), ('\u200d', ' '))
+
+# قبل از hazm: ارقام و همزه؛ بعد از hazm در مسیر embedding: ارقام، همزه و ZWNJ/ZWJ
+# در یک گذر (جفت‌ها هم‌پوشانی ندارند، پس ترتیب اجرای جداگانه حفظ می‌شود)
+_PRE_HAZM_PAIRS = _DIGIT_PAIRS + _HAMZA_PAIRS
+# hazm (persian_numbers=True ارقام را برعکس، به فارسی تبدیل می‌کند) هیچ رقم
+# فارسی/عربی یا أ/إ/ؤ تولید نمی‌کند؛ تنها ء از شکل نمایشی ﺀ در جدول ترجمه آن
+# ساخته می‌شود، پس بعد از hazm فقط همین یک جفت لازم است
+_POST_HAZM_PAIRS = (('ء', ''),)
+_EMBEDDING_POST_HAZM_PAIRS = _POST_HAZM_PAIRS + _JOINER_PAIRS
+_RE_CTRL = re.compile(r'[\x00-\x1f\x7f-\x9f]')
+
+# از این طول به بعد طبقه‌بندی کاراکترهای کنترلی با numpy (برداری) سریع‌تر از regex است
+_NUMPY_CTRL_MIN_LENGTH = 2048
+
+# معادل bytes برای متن ASCII (ZWNJ/ZWJ و 0x80-0x9f در ASCII وجود ندارند)
+_ASCII_CTRL_BYTES = bytes(range(0x00, 0x20)) + b'\x7f'
+
+
+def _replace_all(text: str, pairs) -> str:
+    """Apply (old, new) replacements, skipping characters absent from text."""
+    for old, new in pairs:
+        if old in text:
+            text = text.replace(old, new)
+    return text
+
+
+def _strip_control(text: str) -> str:
+    """Remove C0/C1 control characters (0x00-0x1f, 0x7f-0x9f)."""
+    if len(text) < _NUMPY_CTRL_MIN_LENGTH:
+        return _RE_CTRL.sub('', text)
+    codes = _np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=_np.uint32)
+    mask = (codes < 0x20) | ((codes >= 0x7f) & (codes < 0xa0))
+    if not mask.any():
+        return text
+    return codes[~mask].tobytes().decode('utf-32-le', 'surrogatepass')
+
+
+def _nfc(text: str) -> str:
+    """NFC composition (e.g. ا + ◌ٓ → آ); already-NFC text is returned as-is."""
+    if _unorm_is_normalized('NFC', text):
+        return text
+    return _unorm('NFC', text)
+
+
+# نمونه‌های hazm در سطح ماژول؛ یک بار مقداردهی و پس از آن فقط-خواندنی
+_HAZM_NORM = None
+_HAZM_STEM = None
+_HAZM_AVAILABLE = False
+_HAZM_INITIALIZED = False
+_HAZM_LOCK = threading.Lock()
+
+# آرگومان‌های Normalizer hazm؛ مسیر سریع ASCII بر اساس همین پرچم‌ها تصمیم می‌گیرد
+# (نه ویژگی‌های خصوصی خود hazm)
+# persian_numbers=False to keep English numbers for better search
+# correct_spacing=False to preserve dates like 1361/02/13 (no spaces around /)
+_HAZM_NORMALIZER_OPTIONS = {'persian_numbers': False, 'correct_spacing': False}
+
+# نسخه‌هایی از hazm (major.minor) که در آن‌ها normalize روی ASCII فقط persian_style
+# است (test_ascii_fast_path_matches_hazm)؛ برای نسخه‌های دیگر کل hazm اجرا می‌شود
+_HAZM_ASCII_VERIFIED_VERSIONS = ('0.10',)
+_HAZM_ASCII_FAST_PATH = False
+
+
+def _init_hazm() -> None:
+    """Initialize hazm normalizer and stemmer once per process."""
+    global _HAZM_NORM, _HAZM_STEM, _HAZM_AVAILABLE, _HAZM_INITIALIZED, _HAZM_ASCII_FAST_PATH
+    if _HAZM_INITIALIZED:
+        return
+    with _HAZM_LOCK:
+        if _HAZM_INITIALIZED:
+            return
+        try:
+            from hazm import Normalizer, Stemmer
+            _HAZM_NORM = Normalizer(**_HAZM_NORMALIZER_OPTIONS)
+            _HAZM_STEM = Stemmer()
+            _HAZM_AVAILABLE = True
+            _HAZM_ASCII_FAST_PATH = _hazm_version_verified()
+            logger.info("Hazm normalizer and stemmer initialized successfully (English numbers preserved, spacing preserved)")
+        except ImportError:
+            logger.warning("hazm library not available - text normalization and stemming disabled")
+        _HAZM_INITIALIZED = True
+
+
+def _hazm_version_verified() -> bool:
+    """آیا نسخه نصب‌شده hazm در _HAZM_ASCII_VERIFIED_VERSIONS است؟"""
+    from importlib.metadata import PackageNotFoundError, version
     
-    def __init__(self):
-        self._normalizer = None
-        self._stemmer = None
-        self._lemmatizer = None
-        
-    def _get_normalizer(self):
-        """Lazy load hazm normalizer."""
-        if self._normalizer is None:
-            try:
-                from hazm import Normalizer
-                # persian_numbers=False to keep English numbers for better search
-                # correct_spacing=False to preserve dates like 1361/02/13 (no spaces around /)
-                self._normalizer = Normalizer(
-                    persian_numbers=False,
-                    correct_spacing=False
-                )
-                logger.info("Hazm normalizer initialized successfully (English numbers preserved, spacing preserved)")
-            except ImportError:
-                logger.warning("hazm library not available - text normalization disabled")
-                self._normalizer = False
-        return self._normalizer if self._normalizer is not False else None
+    try:
+        major_minor = '.'.join(version('hazm').split('.')[:2])
+    except PackageNotFoundError:
+        return False
+    if major_minor not in _HAZM_ASCII_VERIFIED_VERSIONS:
+        logger.info(f"hazm {major_minor} not verified for the ASCII fast path; using full normalize")
+        return False
+    return True
+
+
+def _hazm_normalize_ascii(normalizer, text: str) -> str:
+    """
+    hazm normalize برای متن ASCII (فقط وقتی _HAZM_ASCII_FAST_PATH فعال است).
     
-    def _get_stemmer(self):
-        """Lazy load hazm stemmer."""
-        if self._stemmer is None:
-            try:
-                from hazm import Stemmer
-                self._stemmer = Stemmer()
-                logger.info("Hazm stemmer initialized successfully")
-            except ImportError:
-                logger.warning("hazm library not available - stemming disabled")
-                self._stemmer = False
-        return self._stemmer if self._stemmer is not False else None
+    با تنظیمات فعلی تنها مرحله‌ای که روی ASCII اثر دارد persian_style است
+    (" → «»، نقطه اعشار → ٫، ... → …)؛ بقیه مراحل و تبدیل ارقام/همزه بی‌اثرند.
+    """
+    if '"' not in text and '.' not in text:
+        return text
+    if not _HAZM_NORMALIZER_OPTIONS.get('persian_style', True):
+        return text
+    return normalizer.persian_style(text)
+
+
+def _safe_stem(stem, word: str) -> str:
+    """Stem a single word, returning the original if stemming fails."""
+    try:
+        return stem(word)
+    except Exception:
+        return word
+
+
+class TextNormalizer:
+    """Persian text normalizer using hazm library."""
     
     def normalize_text(self, text: str, apply_stemming: bool = False) -> str:
         """
@@ -54,53 +176,59 @@ class TextNormalizer:
         Returns:
             Normalized text
         """
-        if not text or not isinstance(text, str):
+        # برای str دقیق isinstance اجرا نمی‌شود؛ زیرکلاس‌ها (SafeString) همچنان متن هستند
+        if text.__class__ is not str and not isinstance(text, str) or not text:
             return text or ""
         
-        # Convert Persian numbers to English BEFORE hazm normalization
-        # (hazm with persian_numbers=False keeps Persian numbers unchanged)
-        text = self._convert_persian_to_english_numbers(text)
+        _init_hazm()
+        
+        # Fast path: روی متن ASCII از کل hazm فقط persian_style لازم است
+        if _HAZM_ASCII_FAST_PATH and not apply_stemming and text.isascii():
+            return _hazm_normalize_ascii(_HAZM_NORM, text)
         
-        # Normalize hamza characters (Hazm doesn't do this)
-        text = self._normalize_hamza(text)
+        # متن‌های کوتاه تکراری (عنوان‌ها، سرصفحه‌ها، query ها) از cache خوانده می‌شوند
+        if len(text) <= NORMALIZE_CACHE_MAX_LENGTH:
+            return _normalize_cached(text, apply_stemming)
+        return self._normalize(text, apply_stemming)
+    
+    def _normalize(self, text: str, apply_stemming: bool) -> str:
+        """Normalize a non-empty string (uncached)."""
+        # Canonical composition first, so the tables below see composed characters.
+        # Convert Persian numbers to English BEFORE hazm normalization
+        # (hazm with persian_numbers=False keeps Persian numbers unchanged),
+        # and normalize hamza characters (Hazm doesn't do this)
+        text = _replace_all(_nfc(text), _PRE_HAZM_PAIRS)
         
-        # Get normalizer
-        normalizer = self._get_normalizer()
-        if not normalizer:
+        normalizer = _HAZM_NORM
+        if normalizer is None:
             # Fallback to basic normalization if hazm not available
-            return self._basic_normalize(text)
+            return self._finish_basic_normalize(text)
         
         try:
             # Apply hazm normalization
             normalized = normalizer.normalize(text)
             
-            # Convert any remaining Persian numbers to English again (just to be safe)
-            normalized = self._convert_persian_to_english_numbers(normalized)
-            
-            # Normalize hamza again (just to be safe)
-            normalized = self._normalize_hamza(normalized)
+            # Remove standalone hamza produced by hazm (ﺀ → ء)
+            normalized = _replace_all(normalized, _POST_HAZM_PAIRS)
             
             # Optional stemming for better embedding quality
             if apply_stemming:
-                stemmer = self._get_stemmer()
-                if stemmer:
+                stemmer = _HAZM_STEM
+                if stemmer is not None:
                     # Split into words, stem each word, rejoin
+                    # (try/except فقط یک بار؛ محافظت کلمه‌به‌کلمه فقط در مسیر نادر خطا)
                     words = normalized.split()
-                    stemmed_words = []
-                    for word in words:
-                        try:
-                            stemmed = stemmer.stem(word)
-                            stemmed_words.append(stemmed)
-                        except:
-                            # If stemming fails for a word, use original
-                            stemmed_words.append(word)
-                    normalized = ' '.join(stemmed_words)
+                    stem = stemmer.stem
+                    try:
+                        normalized = ' '.join(map(stem, words))
+                    except Exception:
+                        normalized = ' '.join([_safe_stem(stem, word) for word in words])
             
             return normalized
             
         except Exception as e:
             logger.warning(f"Text normalization failed: {e}, falling back to basic normalization")
-            return self._basic_normalize(text)
+            return self._finish_basic_normalize(text)
     
     def _normalize_hamza(self, text: str) -> str:
         """
@@ -117,21 +245,7 @@ class TextNormalizer:
         if not text:
             return ""
         
-        # Hamza normalization mapping
-        # Note: We do NOT normalize ئ because it's used in words like مسئول
-        hamza_mapping = {
-            'أ': 'ا',  # Alef with hamza above → Alef
-            'إ': 'ا',  # Alef with hamza below → Alef
-            'ؤ': 'و',  # Waw with hamza above → Waw
-            # 'ئ': 'ی',  # Yeh with hamza - NOT normalized (used in مسئول, etc.)
-            'ء': '',   # Standalone hamza → remove
-        }
-        
-        result = text
-        for hamza_char, normalized_char in hamza_mapping.items():
-            result = result.replace(hamza_char, normalized_char)
-        
-        return result
+        return _replace_all(text, _HAMZA_PAIRS)
     
     def _convert_persian_to_english_numbers(self, text: str) -> str:
         """
@@ -146,20 +260,7 @@ class TextNormalizer:
         if not text:
             return ""
         
-        # Persian to English number mapping
-        persian_to_english = {
-            '۰': '0', '۱': '1', '۲': '2', '۳': '3', '۴': '4',
-            '۵': '5', '۶': '6', '۷': '7', '۸': '8', '۹': '9',
-            # Arabic-Indic numbers
-            '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
-            '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
-        }
-        
-        result = text
-        for persian, english in persian_to_english.items():
-            result = result.replace(persian, english)
-        
-        return result
+        return _replace_all(text, _DIGIT_PAIRS)
     
     def _basic_normalize(self, text: str) -> str:
         """
@@ -174,32 +275,23 @@ class TextNormalizer:
         if not text:
             return ""
         
-        # Basic Persian character normalization
-        replacements = {
-            'ي': 'ی',  # Arabic yeh to Persian yeh
-            'ك': 'ک',  # Arabic kaf to Persian kaf
-            'ء': '',   # Remove hamza
-            '‌': ' ',   # Replace ZWNJ with space
-            '\u200c': ' ',  # Replace ZWNJ with space
-            '\u200d': ' ',  # Replace ZWJ with space (was empty)
-            '\u200e': '',   # Remove LTR mark
-            '\u200f': '',   # Remove RTL mark
-        }
-        
-        normalized = text
-        for old, new in replacements.items():
-            normalized = normalized.replace(old, new)
-        
-        # Convert Persian numbers to English
-        normalized = self._convert_persian_to_english_numbers(normalized)
-        
-        # Clean up multiple spaces
-        import re
-        normalized = re.sub(r'\s+', ' ', normalized)
-        normalized = normalized.strip()
+        # Basic Persian character normalization + Persian numbers to English
+        normalized = _replace_all(_nfc(text), _BASIC_PAIRS)
+        
+        # Clean up multiple spaces (split/join: collapse + strip در یک پیمایش C)
+        normalized = ' '.join(normalized.split())
         
         return normalized
     
+    def _finish_basic_normalize(self, text: str) -> str:
+        """
+        _basic_normalize برای متنی که NFC، ارقام و همزه روی آن اعمال شده است.
+        
+        مسیر fallback نتیجه پیش‌پردازش قبل از hazm را دوباره محاسبه نمی‌کند؛
+        _nfc فقط بررسی می‌شود (حذف همزه می‌تواند ترکیب تازه‌ای بسازد).
+        """
+        return ' '.join(_replace_all(_nfc(text), _BASIC_CHAR_PAIRS).split())
+    
     def prepare_for_embedding(self, text: str) -> str:
         """
         Prepare text for embedding generation.
@@ -210,28 +302,74 @@ class TextNormalizer:
         Returns:
             Text ready for embedding
         """
-        # Normalize without stemming for embedding (stemming can lose semantic meaning)
-        normalized = self.normalize_text(text, apply_stemming=False)
+        # برای str دقیق isinstance اجرا نمی‌شود؛ زیرکلاس‌ها (SafeString) همچنان متن هستند
+        if text.__class__ is not str and not isinstance(text, str) or not text:
+            return text or ""
         
-        # Additional cleaning for embedding
-        if normalized:
-            import re
-            
-            # Forcefully replace all ZWNJ (zero-width non-joiner) with space
-            # This ensures consistency even if hazm doesn't handle it properly
-            normalized = normalized.replace('‌', ' ').replace('‍', ' ')
-            
-            # Remove extra whitespace and control characters
-            normalized = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', normalized)  # Remove control chars
-            normalized = re.sub(r'\s+', ' ', normalized)  # Normalize whitespace
-            normalized = normalized.strip()
+        if len(text) <= NORMALIZE_CACHE_MAX_LENGTH:
+            return _prepare_for_embedding_cached(text)
+        return self._prepare_for_embedding_fused(text)
+    
+    def _prepare_for_embedding_fused(self, text: str) -> str:
+        """
+        normalize_text(apply_stemming=False) + پاک‌سازی embedding در یک توالی.
         
-        return normalized
+        معادل خروجی مسیر دومرحله‌ای، اما جایگزینی‌های بعد از hazm (ارقام، همزه،
+        ZWNJ/ZWJ) در یک گذر انجام می‌شود و متن میانی دوباره پیمایش نمی‌شود.
+        """
+        _init_hazm()
+        normalizer = _HAZM_NORM
+        
+        # Stemming is never applied for embedding (it can lose semantic meaning)
+        if _HAZM_ASCII_FAST_PATH and text.isascii():
+            # مسیر سریع ASCII همانند normalize_text
+            normalized = _hazm_normalize_ascii(normalizer, text)
+        else:
+            text = _replace_all(_nfc(text), _PRE_HAZM_PAIRS)
+            if normalizer is None:
+                normalized = self._finish_basic_normalize(text)
+            else:
+                try:
+                    normalized = normalizer.normalize(text)
+                except Exception as e:
+                    logger.warning(f"Text normalization failed: {e}, falling back to basic normalization")
+                    normalized = self._finish_basic_normalize(text)
+                else:
+                    # Forcefully replace all ZWNJ/ZWJ with space, together with the
+                    # post-hazm hamza pass
+                    normalized = _replace_all(normalized, _EMBEDDING_POST_HAZM_PAIRS)
+        
+        # Remove control chars (برای متن ASCII با bytes.translate)
+        if normalized.isascii():
+            normalized = normalized.encode('ascii').translate(None, _ASCII_CTRL_BYTES).decode('ascii')
+        else:
+            normalized = _strip_control(normalized)
+        
+        # Remove extra whitespace (همان \s+ → ' ' و strip، بدون موتور regex)
+        return ' '.join(normalized.split())
 
 
 # Global instance
 _text_normalizer = None
 
+# حداکثر طول متنی که نتیجه نرمال‌سازی آن cache می‌شود: در حد عنوان/سرصفحه/query.
+# متن chunk ها (DEFAULT_CHUNK_SIZE) یکتا هستند و تقریباً هرگز hit نمی‌شوند؛ cache
+# کردن آن‌ها فقط حافظه هر process (تا 2×4096 متن چند کیلوبایتی) را پر می‌کند.
+NORMALIZE_CACHE_MAX_LENGTH = 256
+
+
+@lru_cache(maxsize=4096)
+def _normalize_cached(text: str, apply_stemming: bool) -> str:
+    """Cached normalization for short, frequently repeated strings."""
+    return get_text_normalizer()._normalize(text, apply_stemming)
+
+
+@lru_cache(maxsize=4096)
+def _prepare_for_embedding_cached(text: str) -> str:
+    """Cached embedding preparation for short, frequently repeated strings."""
+    return get_text_normalizer()._prepare_for_embedding_fused(text)
+
+
 def get_text_normalizer() -> TextNormalizer:
     """Get global text normalizer instance."""
     global _text_normalizer
@@ -239,6 +377,16 @@ def get_text_normalizer() -> TextNormalizer:
         _text_normalizer = TextNormalizer()
     return _text_normalizer
 
+def warm_up_text_normalizer() -> None:
+    """
+    Load hazm ahead of the first request/task.
+    
+    import hazm حدود ۱.۵ ثانیه طول می‌کشد؛ در شروع worker (قبل از fork در Celery)
+    بارگذاری می‌شود تا اولین متن هزینه cold-start را نپردازد.
+    """
+    _init_hazm()
+    get_text_normalizer()
+
 def normalize_text(text: str, apply_stemming: bool = False) -> str:
     """Convenience function for text normalization."""
     return get_text_normalizer().normalize_text(text, apply_stemming)
@@ -246,3 +394,20 @@ def normalize_text(text: str, apply_stemming: bool = False) -> str:
 def prepare_for_embedding(text: str) -> str:
     """Convenience function to prepare text for embedding."""
     return get_text_normalizer().prepare_for_embedding(text)
+
+def prepare_for_embedding_batch(texts: Iterable[str]) -> List[str]:
+    """
+    Prepare a batch of texts for embedding.
+    
+    The normalizer is resolved once and duplicate texts within the batch
+    (repeated headings, boilerplate) are normalized only once.
+    """
+    prepare = get_text_normalizer().prepare_for_embedding
+    prepared = {}
+    results = []
+    for text in texts:
+        result = prepared.get(text)
+        if result is None:
+            result = prepared[text] = prepare(text)
+        results.append(result)
+    return results
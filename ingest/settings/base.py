@@ -204,6 +204,16 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # JSON با orjson (خروجی همان JSONRenderer/JSONParser)
+    'DEFAULT_RENDERER_CLASSES': [
+        'ingest.api.renderers.OrjsonRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'ingest.api.parsers.OrjsonParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 # S3-Compatible Storage Settings (External MinIO)
@@ -252,11 +262,28 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
+# هیچ بخشی از کد نتیجه تسک‌ها را نمی‌خواند (task id فقط نمایش داده می‌شود)؛
+# بدون ذخیره نتیجه، هر تسک یک SET کمتر روی Redis دارد. تسکی که وضعیتش poll
+# می‌شود باید با @shared_task(ignore_result=False) تعریف شود.
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_RESULT_EXPIRES = 3600  # 1 hour, for tasks that opt back in
 CELERY_TASK_SOFT_TIME_LIMIT = 55 * 60  # 55 minutes
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
 CELERY_BROKER_CONNECTION_RETRY = True
 CELERY_BROKER_CONNECTION_MAX_RETRIES = 10
 
+# تسک‌های chunking/embedding طولانی هستند؛ با prefetch=1 هر worker فقط تسک در حال
+# اجرا را رزرو می‌کند و تسک‌های کوتاه پشت تسک‌های طولانی نمی‌مانند
+# (1 یعنی بدون prefetch اضافه؛ 0 یعنی نامحدود). برای بار CPU-bound قابل افزایش است.
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv('CELERY_WORKER_PREFETCH_MULTIPLIER', '1'))
+# ack بعد از اجرا: تسک worker از کارافتاده دوباره تحویل داده می‌شود
+CELERY_TASK_ACKS_LATE = os.getenv('CELERY_TASK_ACKS_LATE', 'true').lower() == 'true'
+# visibility_timeout ردیس باید از طولانی‌ترین تسک (۶۰ دقیقه) بیشتر باشد،
+# وگرنه تسک unacked در حال اجرا دوباره به worker دیگری داده می‌شود
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'visibility_timeout': int(os.getenv('CELERY_VISIBILITY_TIMEOUT', str(2 * 60 * 60))),
+}
+
 # Celery Beat Schedule - Periodic Tasks
 from celery.schedules import crontab
 CELERY_BEAT_SCHEDULE = {
@@ -295,6 +322,10 @@ CELERY_BEAT_SCHEDULE = {
 # Note: Core API connection is configured via CoreConfig model in database
 # Access via Admin Panel: /admin/embeddings/coreconfig/
 CORE_BASE_URL = os.getenv('CORE_BASE_URL', 'http://localhost:8000')
+CORE_SYNC_WORKERS = int(os.getenv('CORE_SYNC_WORKERS', '4'))  # ارسال همزمان batch ها در sync کامل
+# Core فعلاً endpoint دسته‌ای POST /api/v1/sync/verify_batch را ندارد؛ تا آن زمان
+# verification با درخواست‌های تکی انجام می‌شود (بدون یک POST و 404 اضافه در هر اجرا)
+CORE_BULK_VERIFY_ENABLED = os.getenv('CORE_BULK_VERIFY_ENABLED', 'false').lower() == 'true'
 
 # Chunking Settings
 DEFAULT_CHUNK_SIZE = int(os.getenv('DEFAULT_CHUNK_SIZE', '450'))
@@ -304,7 +335,7 @@ DEFAULT_CHUNK_OVERLAP = int(os.getenv('DEFAULT_CHUNK_OVERLAP', '50'))
 EMBEDDING_PROVIDER = os.getenv('EMBEDDING_PROVIDER', 'e5').lower()
 EMBEDDING_MODEL_ID = os.getenv('EMBEDDING_MODEL_ID', '')  # Auto-detected if empty
 EMBEDDING_DIMENSION = int(os.getenv('EMBEDDING_DIMENSION', '0')) if os.getenv('EMBEDDING_DIMENSION', '').strip() else None  # Auto-detected if None
-EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '16'))
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '0')) if os.getenv('EMBEDDING_BATCH_SIZE', '').strip() else None  # If None, the E5 backend sizes batches from GPU memory
 EMBEDDING_TIMEOUT = int(os.getenv('EMBEDDING_TIMEOUT', '60'))
 EMBEDDING_MAX_RETRIES = int(os.getenv('EMBEDDING_MAX_RETRIES', '3'))
 
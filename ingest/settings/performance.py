@@ -172,15 +172,15 @@ REST_FRAMEWORK.update({
     
     # Renderer (remove browsable API in production)
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'ingest.api.renderers.OrjsonRenderer',
     ) if not DEBUG else (
-        'rest_framework.renderers.JSONRenderer',
+        'ingest.api.renderers.OrjsonRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ),
     
     # Parser (optimize for JSON only if not needed)
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'ingest.api.parsers.OrjsonParser',
     ],
 })
 
@@ -191,7 +191,7 @@ REST_FRAMEWORK.update({
 # Celery performance settings
 CELERY_TASK_SOFT_TIME_LIMIT = 55 * 60  # 55 minutes
 CELERY_TASK_TIME_LIMIT = 60 * 60  # 60 minutes hard limit
-CELERY_WORKER_PREFETCH_MULTIPLIER = 4
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv('CELERY_WORKER_PREFETCH_MULTIPLIER', '1'))  # long-running tasks
 CELERY_WORKER_MAX_TASKS_PER_CHILD = 1000  # Restart worker after 1000 tasks to prevent memory leaks
 
 # Result backend optimization
@@ -212,7 +212,8 @@ CELERY_RESULT_BACKEND_TRANSPORT_OPTIONS = {
 LOGGING['handlers'].update({
     'file': {
         'level': 'ERROR',
-        'class': 'logging.handlers.RotatingFileHandler',
+        # RotatingFileHandler behind a queue: disk I/O and rotation run on a listener thread
+        'class': 'ingest.core.logging_handlers.QueuedRotatingFileHandler',
         'filename': '/app/logs/django.log',
         'maxBytes': 1024 * 1024 * 100,  # 100 MB
         'backupCount': 10,
@@ -254,7 +255,6 @@ if not DEBUG:
 # =======================
 
 # Embedding service optimizations
-EMBEDDING_BATCH_SIZE = 32  # Increase batch size for better GPU utilization
 EMBEDDING_MAX_WORKERS = 4  # Parallel processing workers
 EMBEDDING_CACHE_TTL = 3600  # Cache embeddings for 1 hour
 
@@ -266,9 +266,7 @@ DEFAULT_CHUNK_OVERLAP = int(os.getenv('DEFAULT_CHUNK_OVERLAP', '80'))
 # Memory Management
 # =======================
 
-# Garbage collection tuning
-import gc
-gc.set_threshold(700, 10, 10)  # Tune garbage collection
+# Garbage collection tuning for Celery workers: see tune_worker_gc in ingest/celery.py
 
 # =======================
 # Export Settings
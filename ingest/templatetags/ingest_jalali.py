@@ -1,8 +1,12 @@
 """Custom template tags for Jalali date conversion in Ingest system."""
+from datetime import timezone as dt_timezone
+
 from django import template
 from django.utils import timezone
 import jdatetime
 
+from ingest.core.jalali import PERSIAN_MONTHS, PERSIAN_WEEKDAYS, _get_display_tz
+
 register = template.Library()
 
 
@@ -15,7 +19,7 @@ def jalali_date(value, format_string='%Y/%m/%d'):
     try:
         # Convert to Tehran timezone if it's a datetime
         if hasattr(value, 'astimezone'):
-            tehran_tz = timezone.get_current_timezone()
+            tehran_tz = _get_display_tz()
             value = value.astimezone(tehran_tz)
         
         # Convert to jdatetime
@@ -44,7 +48,7 @@ def jalali_datetime(value, format_string='%Y/%m/%d %H:%M'):
     try:
         # Convert to Tehran timezone
         if hasattr(value, 'astimezone'):
-            tehran_tz = timezone.get_current_timezone()
+            tehran_tz = _get_display_tz()
             value = value.astimezone(tehran_tz)
         
         # Convert to jdatetime
@@ -57,10 +61,8 @@ def jalali_datetime(value, format_string='%Y/%m/%d %H:%M'):
         return str(value)
 
 
-@register.filter
-def jalali_short_date(value):
-    """Convert to short Jalali date format."""
-    return jalali_date(value, '%Y/%m/%d')
+# Short Jalali date format: same as jalali_date's default '%Y/%m/%d'
+jalali_short_date = register.filter('jalali_short_date', jalali_date)
 
 
 @register.filter
@@ -72,7 +74,7 @@ def jalali_long_date(value):
     try:
         # Convert to Tehran timezone if it's a datetime
         if hasattr(value, 'astimezone'):
-            tehran_tz = timezone.get_current_timezone()
+            tehran_tz = _get_display_tz()
             value = value.astimezone(tehran_tz)
         
         # Convert to jdatetime
@@ -81,27 +83,9 @@ def jalali_long_date(value):
         else:
             j_date = jdatetime.date.fromgregorian(date=value)
         
-        # Persian day names
-        day_names = {
-            0: 'شنبه',
-            1: 'یکشنبه', 
-            2: 'دوشنبه',
-            3: 'سه‌شنبه',
-            4: 'چهارشنبه',
-            5: 'پنج‌شنبه',
-            6: 'جمعه'
-        }
-        
-        # Persian month names
-        month_names = {
-            1: 'فروردین', 2: 'اردیبهشت', 3: 'خرداد',
-            4: 'تیر', 5: 'مرداد', 6: 'شهریور',
-            7: 'مهر', 8: 'آبان', 9: 'آذر',
-            10: 'دی', 11: 'بهمن', 12: 'اسفند'
-        }
-        
-        day_name = day_names.get(j_date.weekday(), '')
-        month_name = month_names.get(j_date.month, str(j_date.month))
+        # jdatetime weekday(): 0 = شنبه; month: 1-12
+        day_name = PERSIAN_WEEKDAYS[j_date.weekday()]
+        month_name = PERSIAN_MONTHS[j_date.month - 1]
         
         return f"{day_name} {j_date.day} {month_name} {j_date.year}"
     except (ValueError, AttributeError, TypeError):
@@ -115,13 +99,12 @@ def time_ago_jalali(value):
         return ''
     
     try:
-        now = timezone.now()
-        if hasattr(value, 'astimezone'):
-            tehran_tz = timezone.get_current_timezone()
-            value = value.astimezone(tehran_tz)
-            now = now.astimezone(tehran_tz)
+        # اختلاف دو datetime آگاه به منطقه زمانی نمایش بستگی ندارد؛
+        # فقط مقدار naive (مثل قبل، به وقت محلی سیستم) آگاه می‌شود
+        if timezone.is_naive(value):
+            value = value.astimezone(dt_timezone.utc)
         
-        diff = now - value
+        diff = timezone.now() - value
         
         if diff.days > 0:
             if diff.days == 1:
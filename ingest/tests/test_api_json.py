@@ -0,0 +1,69 @@
+"""
+تست parser و renderer مبتنی بر orjson
+"""
+import datetime
+import decimal
+import io
+import uuid
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from ingest.api.parsers import OrjsonParser
+from ingest.api.renderers import OrjsonRenderer
+
+
+class OrjsonRendererTest(SimpleTestCase):
+    """خروجی OrjsonRenderer باید با JSONRenderer یکسان باشد"""
+
+    def test_matches_json_renderer(self):
+        data = {
+            'id': uuid.uuid4(),
+            'created_at': timezone.now(),
+            'naive': datetime.datetime(2024, 1, 2, 3, 4, 5, 123456),
+            'date': datetime.date(2024, 3, 20),
+            'time': datetime.time(1, 2, 3, 456789),
+            'amount': decimal.Decimal('1.10'),
+            'message': gettext_lazy('This field is required.'),
+            'errors': [ErrorDetail('نامعتبر', code='invalid')],
+            'tags': {'law'},
+            'counts': {1: 'x', 2: None},
+            'separator': 'a b c',
+            'big': 2 ** 70,
+            'nested': [(1, 2.5), {'ok': True}],
+        }
+        self.assertEqual(OrjsonRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indent_and_none(self):
+        data = {'a': [1, 2]}
+        context = {'indent': 2}
+        self.assertEqual(
+            OrjsonRenderer().render(data, renderer_context=context),
+            JSONRenderer().render(data, renderer_context=context),
+        )
+        self.assertEqual(OrjsonRenderer().render(None), b'')
+
+
+class OrjsonParserTest(SimpleTestCase):
+    """OrjsonParser باید همان نتیجه و خطای JSONParser را بدهد"""
+
+    def parse(self, parser, body):
+        return parser.parse(io.BytesIO(body), parser_context={'encoding': 'utf-8'})
+
+    def test_matches_json_parser(self):
+        bodies = [
+            '{"a": [1, 2.5, "سلام", null, true], "b": {"c": -3}}'.encode(),
+            b'{"big": 12345678901234567890123, "neg": -9223372036854775809}',
+        ]
+        for body in bodies:
+            self.assertEqual(self.parse(OrjsonParser(), body), self.parse(JSONParser(), body))
+        self.assertIsInstance(self.parse(OrjsonParser(), bodies[1])['big'], int)
+
+    def test_invalid_json_raises_parse_error(self):
+        for body in (b'{', b'{"a": NaN}'):
+            with self.assertRaises(ParseError):
+                self.parse(OrjsonParser(), body)
@@ -1,8 +1,9 @@
 """
 Test for automatic chunking and embedding system.
 Tests both Legal Unit and QA Entry automatic processing with proper Django test framework.
+With CELERY_TASK_ALWAYS_EAGER (test settings) the signal-triggered tasks run
+synchronously inside create(), so results are checked immediately.
 """
-import time
 from django.test import TestCase
 from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
@@ -33,9 +34,6 @@ class AutoEmbeddingTest(TestCase):
             content=self.test_content
         )
         
-        # Wait for signal processing
-        time.sleep(3)
-        
         # Check chunks created
         chunks = Chunk.objects.filter(unit_id=lu.id)
         self.assertGreater(chunks.count(), 0, "Chunks should be created automatically")
@@ -55,9 +53,6 @@ class AutoEmbeddingTest(TestCase):
             content=self.test_content
         )
         
-        # Wait for chunking and embedding
-        time.sleep(8)
-        
         # Get chunks
         chunks = Chunk.objects.filter(unit_id=lu.id)
         self.assertGreater(chunks.count(), 0)
@@ -91,9 +86,6 @@ class AutoEmbeddingTest(TestCase):
             category='test'
         )
         
-        # Wait for embedding
-        time.sleep(8)
-        
         # Check QA embedding
         qa_ct = ContentType.objects.get_for_model(QAEntry)
         qa_embedding = Embedding.objects.filter(
@@ -122,17 +114,15 @@ class AutoEmbeddingTest(TestCase):
             content=self.test_content
         )
         
-        # Wait for complete processing
-        time.sleep(10)
-        
         # Verify full chain
         chunks = Chunk.objects.filter(unit_id=lu.id)
         self.assertGreater(chunks.count(), 0, "Chunks created")
         
         chunk_ct = ContentType.objects.get_for_model(Chunk)
+        chunk_ids = chunks.values_list('id', flat=True)
         embeddings = Embedding.objects.filter(
             content_type=chunk_ct,
-            object_id__in=[str(c.id) for c in chunks]
+            object_id__in=[str(cid) for cid in chunk_ids]
         )
         
         self.assertEqual(
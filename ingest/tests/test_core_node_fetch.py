@@ -1,45 +1,31 @@
 """
 تست برای خواندن و نمایش یک نمونه Node از Core API
 """
-import requests
 import json
 from django.test import TestCase
-from ingest.apps.embeddings.models import CoreConfig, SyncLog
+from ingest.apps.embeddings.models import SyncLog
 from ingest.apps.documents.models import Chunk
+from ingest.core.sync.node_verifier import create_verifier_from_config
 
 
 def fetch_node_from_core(node_id: str):
     """
     دریافت یک node از Core API
     
+    از CoreConfig کش‌شده و session مشترک (connection pool) verifier استفاده می‌کند.
+    
     Args:
         node_id: UUID نود
         
     Returns:
         dict: اطلاعات node یا None
     """
-    config = CoreConfig.get_config()
-    
     # Endpoint: GET /api/v1/sync/node/{node_id}
-    url = f"{config.core_api_url}/api/v1/sync/node/{node_id}"
-    
-    try:
-        response = requests.get(
-            url,
-            headers={'X-API-Key': config.core_api_key},
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"❌ خطا: {response.status_code}")
-            print(f"Response: {response.text}")
-            return None
-            
-    except Exception as e:
-        print(f"❌ Exception: {e}")
-        return None
+    node_data = create_verifier_from_config().get_node(node_id)
+    
+    if node_data is None:
+        print("❌ خطا در دریافت node (جزئیات در لاگ)")
+    return node_data
 
 
 def display_node(node_data: dict):
@@ -13,7 +13,8 @@ from ingest.core.jalali import (
     persian_digits,
     english_digits,
     get_jalali_month_name,
-    get_jalali_weekday_name
+    get_jalali_weekday_name,
+    _get_display_tz,
 )
 
 
@@ -162,6 +163,13 @@ class JalaliUtilsTest(TestCase):
         # Should convert to Berlin time before Jalali conversion
         self.assertIn("1403/01/01", result)
     
+    def test_display_timezone_cache_follows_setting(self):
+        """Cached display timezone is reset when DISPLAY_TIME_ZONE changes."""
+        with override_settings(DISPLAY_TIME_ZONE='Europe/Berlin'):
+            self.assertEqual(str(_get_display_tz()), 'Europe/Berlin')
+        with override_settings(DISPLAY_TIME_ZONE='Asia/Tehran'):
+            self.assertEqual(str(_get_display_tz()), 'Asia/Tehran')
+
     def test_roundtrip_conversion(self):
         """Test that date conversion roundtrips correctly."""
         # Gregorian -> Jalali -> Gregorian should be consistent
@@ -0,0 +1,48 @@
+"""
+تست handler لاگ فایل مبتنی بر صف
+"""
+import logging
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ingest.core import logging_handlers
+from ingest.core.logging_handlers import QueuedRotatingFileHandler
+
+
+class QueuedRotatingFileHandlerTest(SimpleTestCase):
+    """تست QueuedRotatingFileHandler"""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, 'django.log')
+        self.handler = QueuedRotatingFileHandler(self.path, maxBytes=1024 * 1024, backupCount=1)
+        self.handler.setFormatter(logging.Formatter('{levelname} {message}', style='{'))
+        self.addCleanup(self.handler.close)
+        self.logger = logging.getLogger('ingest.tests.queued_file')
+        self.logger.propagate = False
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def _read(self):
+        with open(self.path, encoding='utf-8') as f:
+            return f.read()
+
+    def test_records_written_by_listener_after_close(self):
+        self.logger.error('خطا %d', 1)
+        self.logger.error('second')
+        self.handler.close()
+        self.assertEqual(self._read(), 'ERROR خطا 1\nERROR second\n')
+
+    def test_listener_restarted_after_fork(self):
+        self.logger.error('parent')
+        old_queue = self.handler.queue
+        self.addCleanup(self.handler._listener.stop)
+        with mock.patch.object(logging_handlers.os, 'getpid', return_value=os.getpid() + 1):
+            self.logger.error('child')
+            self.assertIsNot(self.handler.queue, old_queue)
+            self.handler.close()
+        self.assertIn('ERROR child\n', self._read())
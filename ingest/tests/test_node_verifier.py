@@ -0,0 +1,125 @@
+"""
+تست‌های واحد برای CoreNodeVerifier و CoreNodeDeleter
+"""
+import asyncio
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from ingest.apps.embeddings.models import CoreConfig
+from ingest.core.sync.node_verifier import (
+    CoreNodeDeleter,
+    CoreNodeVerifier,
+    create_deleter_from_config,
+    create_verifier_from_config,
+    reset_core_config_cache,
+)
+
+
+class CoreConfigCacheTest(TestCase):
+    """تست cache شدن CoreConfig برای ساخت verifier/deleter"""
+    
+    def setUp(self):
+        cache.clear()
+        reset_core_config_cache()
+        self.addCleanup(reset_core_config_cache)
+    
+    def test_config_is_cached(self):
+        """ساخت چند verifier فقط یک بار CoreConfig را می‌خواند"""
+        CoreConfig.get_config()
+        
+        with self.assertNumQueries(1):
+            create_verifier_from_config()
+            create_deleter_from_config()
+            create_verifier_from_config()
+    
+    def test_save_invalidates_cache(self):
+        """ذخیره CoreConfig cache را پاک می‌کند"""
+        config = CoreConfig.get_config()
+        self.assertEqual(create_verifier_from_config().base_url, 'http://localhost:7001')
+        
+        config.core_api_url = 'http://core.example:7001/'
+        config.core_api_key = 'secret'
+        # فقط کلید دقیق حذف می‌شود (بدون invalidate_pattern و لاگ خطای آن)
+        with self.assertNoLogs('ingest.core.optimizations', 'ERROR'):
+            config.save()
+        
+        verifier = create_verifier_from_config()
+        self.assertEqual(verifier.base_url, 'http://core.example:7001')
+        self.assertEqual(verifier.headers, {'X-API-Key': 'secret'})
+
+    
+    def test_local_copy_expires(self):
+        """تغییر config در process دیگر پس از CORE_CONFIG_LOCAL_TTL دیده می‌شود"""
+        config = CoreConfig.get_config()
+        create_verifier_from_config()
+        
+        # شبیه‌سازی ذخیره در process دیگر: ردیف و cache مشترک عوض شده‌اند،
+        # ولی signal در این process اجرا نشده است
+        CoreConfig.objects.filter(pk=config.pk).update(core_api_key='rotated')
+        cache.clear()
+        
+        now = time.monotonic()
+        with mock.patch('ingest.core.sync.node_verifier.time.monotonic') as monotonic:
+            monotonic.return_value = now + 10
+            self.assertNotEqual(create_verifier_from_config().api_key, 'rotated')
+            
+            monotonic.return_value += 60
+            self.assertEqual(create_verifier_from_config().api_key, 'rotated')
+
+
+class RunningEventLoopTest(SimpleTestCase):
+    """عملیات دسته‌ای داخل event loop در حال اجرا (ASGI) به مسیر thread می‌روند"""
+    
+    NODE_ID = '6f1c2b1e-8d2a-4c1e-9b1a-1f2e3d4c5b6a'
+    
+    def test_verify_multiple_nodes_inside_running_loop(self):
+        verifier = CoreNodeVerifier('http://core.example', 'key')
+        
+        async def _call():
+            return verifier.verify_multiple_nodes([self.NODE_ID])
+        
+        with mock.patch.object(CoreNodeVerifier, 'node_exists', return_value=True):
+            results = asyncio.run(_call())
+        
+        self.assertEqual(results[self.NODE_ID], {'exists': True, 'verified': True, 'error': None})
+    
+    def test_delete_multiple_nodes_inside_running_loop(self):
+        deleter = CoreNodeDeleter('http://core.example', 'key')
+        
+        async def _call():
+            return deleter.delete_multiple_nodes([self.NODE_ID])
+        
+        with mock.patch.object(CoreNodeDeleter, 'delete_node', return_value=(True, None)):
+            results = asyncio.run(_call())
+        
+        self.assertEqual(results[self.NODE_ID], {'deleted': True, 'error': None})
+
+
+class VerifyNodeMessagesTest(SimpleTestCase):
+    """پیام‌های عدم تطابق verify_node مقدار دریافتی و مورد انتظار را نشان می‌دهند"""
+    
+    def test_mismatch_messages_include_values(self):
+        verifier = CoreNodeVerifier('http://core.example', 'key')
+        node = {
+            'exists': True,
+            'text': 'متن Core',
+            'document_id': 'doc-1',
+            'document_type': 'chunk',
+            'language': 'fa',
+            'vector': [0.0] * 768,
+            'metadata': {'work_title': 'قانون'},
+        }
+        
+        with mock.patch.object(CoreNodeVerifier, 'get_node', return_value=node):
+            is_valid, errors = verifier.verify_node(
+                'node', {'text': 'متن محلی', 'document_id': 'doc-2', 'language': 'fa'}
+            )
+        
+        self.assertFalse(is_valid)
+        self.assertEqual(errors, [
+            "متن با داده مورد انتظار مطابقت ندارد: 'متن Core' != 'متن محلی'",
+            "document_id مطابقت ندارد: doc-1 != doc-2",
+        ])
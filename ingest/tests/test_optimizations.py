@@ -0,0 +1,115 @@
+"""
+تست‌های واحد برای ابزارهای بهینه‌سازی دیتابیس
+"""
+import datetime
+import uuid
+
+from django.test import SimpleTestCase, TestCase
+
+from ingest.core.optimizations import DatabaseOptimizations, MemoryOptimizer, PerformanceMonitor
+
+
+class CopyFormatTest(SimpleTestCase):
+    """تست فرمت مقادیر برای COPY ... FROM STDIN"""
+    
+    def test_special_values(self):
+        fmt = DatabaseOptimizations._format_value_for_copy
+        self.assertEqual(fmt(None), '\\N')
+        self.assertEqual(fmt(True), 't')
+        self.assertEqual(fmt(False), 'f')
+        self.assertEqual(fmt(5), '5')
+        self.assertEqual(
+            fmt(datetime.datetime(2024, 1, 2, 3, 4, 5)), '2024-01-02T03:04:05'
+        )
+        node_id = uuid.uuid4()
+        self.assertEqual(fmt(node_id), str(node_id))
+    
+    def test_escapes_text(self):
+        fmt = DatabaseOptimizations._format_value_for_copy
+        self.assertEqual(fmt('a\tb\nc\\d'), 'a\\tb\\nc\\\\d')
+        self.assertEqual(fmt({'k': 'ماده'}), '{"k": "ماده"}')
+
+
+class FastInsertTest(TestCase):
+    """تست درج دسته‌ای fast_insert"""
+    
+    def test_inserts_dict_rows(self):
+        from django.utils import timezone
+        from ingest.apps.embeddings.models_synclog import SyncStats
+        
+        now = timezone.now()
+        rows = [
+            {
+                'timestamp': now, 'total_embeddings': i, 'synced_count': 0,
+                'verified_count': 0, 'failed_count': 0, 'pending_count': i,
+                'sync_percentage': 0.0, 'verification_percentage': 0.0,
+            }
+            for i in range(3)
+        ]
+        
+        self.assertEqual(DatabaseOptimizations.fast_insert(SyncStats, rows), 3)
+        self.assertEqual(
+            sorted(SyncStats.objects.values_list('total_embeddings', flat=True)),
+            [0, 1, 2]
+        )
+    
+    def test_tuple_rows_with_columns(self):
+        from django.utils import timezone
+        from ingest.apps.embeddings.models_synclog import SyncStats
+        
+        columns = [
+            'timestamp', 'total_embeddings', 'synced_count', 'verified_count',
+            'failed_count', 'pending_count', 'sync_percentage', 'verification_percentage',
+        ]
+        now = timezone.now()
+        rows = [(now, i, 0, 0, 0, i, 0.0, 0.0) for i in range(2)]
+        
+        self.assertEqual(DatabaseOptimizations.fast_insert(SyncStats, rows, columns=columns), 2)
+        self.assertEqual(SyncStats.objects.count(), 2)
+    
+    def test_tuple_rows_require_columns(self):
+        from ingest.apps.embeddings.models_synclog import SyncStats
+        with self.assertRaises(ValueError):
+            DatabaseOptimizations.fast_insert(SyncStats, [(1, 2)])
+    
+    def test_empty_rows(self):
+        from ingest.apps.embeddings.models_synclog import SyncStats
+        self.assertEqual(DatabaseOptimizations.fast_insert(SyncStats, []), 0)
+
+
+class MeasureQueriesTest(TestCase):
+    """تست شمارش Query ها بدون connection.queries"""
+    
+    def test_counts_queries(self):
+        from ingest.apps.embeddings.models_synclog import SyncStats
+        
+        with PerformanceMonitor.measure(slowest=2) as stats:
+            for _ in range(3):
+                list(SyncStats.objects.all())
+        
+        self.assertEqual(stats['count'], 3)
+        self.assertEqual(len(stats['slowest']), 2)
+        self.assertGreaterEqual(stats['time'], 0)
+
+
+class OptimizedSerializerTest(SimpleTestCase):
+    """تست cache شدن serializer با فیلدهای محدود"""
+    
+    def _request(self, fields):
+        from types import SimpleNamespace
+        return SimpleNamespace(query_params={'fields': fields})
+    
+    def test_class_is_reused(self):
+        from ingest.api.masterdata.serializers import JurisdictionSerializer
+        
+        first = MemoryOptimizer.optimize_serializer_fields(JurisdictionSerializer, self._request('name,id'))
+        second = MemoryOptimizer.optimize_serializer_fields(JurisdictionSerializer, self._request('id,name'))
+        
+        self.assertIs(first, second)
+        self.assertEqual(first.Meta.fields, ['id', 'name'])
+    
+    def test_unknown_fields_are_dropped(self):
+        from ingest.api.masterdata.serializers import JurisdictionSerializer
+        
+        result = MemoryOptimizer.optimize_serializer_fields(JurisdictionSerializer, self._request('bogus'))
+        self.assertIs(result, JurisdictionSerializer)
@@ -0,0 +1,236 @@
+"""
+تست‌های واحد برای payload_builder (ساخت payload برای sync با Core)
+"""
+import datetime
+import json
+from unittest import mock
+
+import numpy as np
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ingest.apps.documents.models import (
+    Chunk, InstrumentExpression, InstrumentManifestation, InstrumentWork,
+    LegalUnit, QAEntry, TextEntry,
+)
+from ingest.apps.embeddings.models import Embedding
+from ingest.apps.masterdata.models import (
+    IssuingAuthority, Jurisdiction, Language, Vocabulary, VocabularyTerm,
+)
+from ingest.core.sync.payload_builder import (
+    PayloadBuilderContext,
+    build_summary_payload,
+    build_summary_payloads,
+    calculate_metadata_hash,
+    dumps_payload,
+    dumps_sync_body,
+)
+
+
+class PayloadBuilderTestMixin:
+    """ساخت داده‌های پایه (بدون اجرای task های chunking/embedding)"""
+
+    DIM = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        with mock.patch('ingest.apps.documents.processing.tasks.process_legal_unit_chunks.delay'), \
+             mock.patch('ingest.apps.documents.processing.tasks.process_qa_entry_chunks.delay'), \
+             mock.patch('ingest.apps.documents.processing.tasks.process_text_entry_chunks.delay'), \
+             mock.patch('ingest.apps.embeddings.tasks.batch_generate_embeddings_for_queryset.delay'):
+            cls._create_fixtures()
+
+    @classmethod
+    def _create_fixtures(cls):
+        jurisdiction = Jurisdiction.objects.create(name='ایران', code='IR')
+        authority = IssuingAuthority.objects.create(
+            name='مجلس', short_name='majlis', jurisdiction=jurisdiction
+        )
+        language = Language.objects.create(name='فارسی', code='fa')
+        vocabulary = Vocabulary.objects.create(name='موضوعات', code='topics')
+        cls.term = VocabularyTerm.objects.create(vocabulary=vocabulary, term='مالیات', code='tax')
+
+        work = InstrumentWork.objects.create(
+            title_official='قانون نمونه', jurisdiction=jurisdiction,
+            authority=authority, urn_lex='urn:lex:ir:sample'
+        )
+        expr = InstrumentExpression.objects.create(
+            work=work, language=language, expression_date=datetime.date(2020, 1, 1)
+        )
+        manifestation = InstrumentManifestation.objects.create(
+            expr=expr, publication_date=datetime.date(2020, 2, 1),
+            in_force_from=datetime.date(2020, 3, 1)
+        )
+
+        cls.units = []
+        for i in range(3):
+            unit = LegalUnit.objects.create(
+                work=work, expr=expr, manifestation=manifestation,
+                unit_type='article', number=str(i + 1), path_label=f'ماده {i + 1}',
+                content=f'متن ماده {i + 1}', valid_from=datetime.date(2020, 3, 1)
+            )
+            unit.vocabulary_terms.add(cls.term)
+            cls.units.append(unit)
+
+        qaentry = QAEntry.objects.create(question='سؤال؟', answer='پاسخ.')
+        qaentry.tags.add(cls.term)
+        qaentry.related_units.add(cls.units[0])
+
+        textentry = TextEntry.objects.create(title='بخشنامه', content='متن بخشنامه')
+        textentry.vocabulary_terms.add(cls.term)
+        textentry.related_units.add(cls.units[1])
+
+        chunk_ct = ContentType.objects.get_for_model(Chunk)
+        cls.embeddings = []
+        sources = [{'unit': unit} for unit in cls.units] + [{'qaentry': qaentry}, {'textentry': textentry}]
+        for i, source in enumerate(sources):
+            chunk = Chunk.objects.create(
+                expr=expr if 'unit' in source else None,
+                chunk_text=f'چانک {i}', token_count=3,
+                citation_payload_json={'chunk_index': i}, hash=f'{i:064d}',
+                **source
+            )
+            cls.embeddings.append(cls._embedding(chunk_ct, chunk.id, 0.1 * i, f'چانک {i}'))
+
+        cls.embeddings.append(cls._embedding(
+            ContentType.objects.get_for_model(QAEntry), qaentry.id, 0.5, 'qa'
+        ))
+        cls.embeddings.append(cls._embedding(
+            ContentType.objects.get_for_model(TextEntry), textentry.id, 0.7, 'text'
+        ))
+
+    @classmethod
+    def _embedding(cls, content_type, object_id, value, text):
+        return Embedding.objects.create(
+            content_type=content_type, object_id=object_id, model_id='test-model',
+            vector=[value] * cls.DIM, dim=cls.DIM, dimension=cls.DIM, text_content=text
+        )
+
+
+@override_settings(EMBEDDING_DIMENSION=PayloadBuilderTestMixin.DIM)
+class BuildSummaryPayloadsTest(PayloadBuilderTestMixin, TestCase):
+    """تست ساخت دسته‌ای payload ها"""
+
+    def _embeddings(self):
+        return Embedding.objects.filter(
+            id__in=[e.id for e in self.embeddings]
+        ).select_related('content_type').order_by('created_at')
+
+    def test_batch_matches_single(self):
+        """خروجی نسخه دسته‌ای با build_summary_payload یکسان است"""
+        expected = {str(emb.id): build_summary_payload(emb) for emb in self._embeddings()}
+
+        results = build_summary_payloads(self._embeddings())
+
+        self.assertEqual(len(results), len(self.embeddings))
+        for emb, payload in results:
+            self.assertIsNotNone(payload)
+            expected_payload = expected[str(emb.id)]
+            np.testing.assert_array_equal(payload.pop('vector'), expected_payload.pop('vector'))
+            self.assertEqual(payload, expected_payload)
+
+    def test_vector_serialized_from_ndarray(self):
+        """بردار به صورت ndarray float32 نگه داشته و به JSON لیست نوشته می‌شود"""
+        payload = build_summary_payload(self._embeddings().first())
+
+        self.assertIsInstance(payload['vector'], np.ndarray)
+        self.assertEqual(payload['vector'].dtype, np.float32)
+        decoded = json.loads(dumps_payload({'embeddings': [payload]}))
+        self.assertEqual(len(decoded['embeddings'][0]['vector']), self.DIM)
+
+    def test_query_count_is_constant(self):
+        """تعداد کوئری‌ها به تعداد embedding ها وابسته نیست"""
+        with self.assertNumQueries(13):
+            results = build_summary_payloads(self._embeddings())
+
+        chunk_payload = results[0][1]
+        self.assertEqual(chunk_payload['metadata']['tags'], ['مالیات'])
+        self.assertEqual(chunk_payload['metadata']['jurisdiction'], 'ایران')
+
+    def test_context_caches_parent_fields(self):
+        """فیلدهای work/manifestation یک بار به ازای هر والد ساخته می‌شوند"""
+        context = PayloadBuilderContext()
+        chunk_embeddings = self._embeddings()[:len(self.units)]
+
+        payloads = [build_summary_payload(emb, context) for emb in chunk_embeddings]
+
+        self.assertEqual(len(context._work_cache), 1)
+        self.assertEqual(len(context._manifestation_cache), 1)
+        self.assertEqual(len(context._unit_static_cache), len(self.units))
+        # valid_from مشترک سه واحد فقط یک بار isoformat می‌شود
+        self.assertIn((datetime.date(2020, 3, 1), None), context._iso_cache)
+        self.assertEqual(payloads[0]['metadata']['valid_from'], '2020-03-01')
+        self.assertEqual(
+            {p['metadata']['path_label'] for p in payloads},
+            {unit.path_label for unit in self.units},
+        )
+
+    def test_builder_table_resolved_once_per_batch(self):
+        """نگاشت content type به builder یک بار برای کل batch ساخته می‌شود"""
+        from ingest.core.sync import payload_builder
+
+        with mock.patch.object(
+            payload_builder, '_payload_builders', wraps=payload_builder._payload_builders
+        ) as resolve:
+            results = build_summary_payloads(self._embeddings())
+
+        self.assertEqual(resolve.call_count, 1)
+        self.assertTrue(all(payload for _, payload in results))
+
+
+class VectorArrayTest(SimpleTestCase):
+    """تست تبدیل بردار به ndarray"""
+
+    def test_parses_string_vector(self):
+        from ingest.core.sync.payload_builder import _vector_array
+
+        vector = _vector_array('[0.5, -1.25,2]')
+
+        self.assertEqual(vector.dtype, np.float32)
+        np.testing.assert_array_equal(vector, np.array([0.5, -1.25, 2], dtype=np.float32))
+        self.assertEqual(_vector_array('[]').shape, (0,))
+
+    def test_float32_ndarray_is_not_copied(self):
+        from ingest.core.sync.payload_builder import _vector_array
+
+        vector = np.array([0.5, 1.5], dtype=np.float32)
+        self.assertIs(_vector_array(vector), vector)
+
+        converted = _vector_array(np.array([0.5, 1.5]))
+        self.assertEqual(converted.dtype, np.float32)
+        self.assertEqual(_vector_array([0.5, 1.5]).dtype, np.float32)
+
+
+class DumpsSyncBodyTest(SimpleTestCase):
+    """تست ساخت بدنه sync از payload های سریال‌شده"""
+
+    def test_matches_full_serialization(self):
+        from ingest.core.sync import payload_builder
+
+        payloads = [
+            {'id': '1', 'text': 'ماده ۱', 'vector': np.array([0.5, 1.0], dtype=np.float32)},
+            {'id': '2', 'text': 'ماده ۲', 'vector': np.array([2.0, 0.25], dtype=np.float32)},
+        ]
+        expected = json.loads(dumps_payload({'embeddings': payloads, 'sync_type': 'metadata_update'}))
+
+        for orjson_module in (payload_builder.orjson, None):
+            with mock.patch.object(payload_builder, 'orjson', orjson_module):
+                body = dumps_sync_body([dumps_payload(p) for p in payloads], 'metadata_update')
+                self.assertEqual(json.loads(body), expected)
+
+
+class MetadataHashTest(SimpleTestCase):
+    """تست هش metadata"""
+
+    def test_hash_is_stable_with_and_without_orjson(self):
+        from ingest.core.sync import payload_builder
+
+        payload = {'text': 'ماده ۱', 'language': 'fa', 'tags': ['مالیات'], 'vector': [0.1]}
+        digest = calculate_metadata_hash(payload)
+
+        with mock.patch.object(payload_builder, 'orjson', None):
+            self.assertEqual(calculate_metadata_hash(payload), digest)
+
+        self.assertEqual(calculate_metadata_hash({**payload, 'vector': [0.2]}), digest)
+        self.assertNotEqual(calculate_metadata_hash({**payload, 'text': 'ماده ۲'}), digest)
@@ -0,0 +1,300 @@
+"""
+تست‌های واحد برای CoreSyncService
+"""
+import json
+import uuid
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ingest.apps.documents.models import Chunk
+from ingest.apps.embeddings.models import CoreConfig, Embedding
+from ingest.apps.embeddings.models_synclog import SyncLog, SyncStats
+from ingest.core.sync.payload_builder import build_summary_payload, calculate_metadata_hash
+from ingest.core.sync.sync_service import CoreSyncService
+from ingest.tests.test_payload_builder import PayloadBuilderTestMixin
+
+
+@override_settings(EMBEDDING_DIMENSION=PayloadBuilderTestMixin.DIM)
+class SyncChangedMetadataTest(PayloadBuilderTestMixin, TestCase):
+    """تست resync متادیتای تغییرکرده"""
+
+    def test_skips_embeddings_whose_metadata_core_already_has(self):
+        unchanged, changed = self.embeddings[0], self.embeddings[1]
+        Embedding.objects.filter(id__in=[unchanged.id, changed.id]).update(
+            synced_to_core=True, metadata_hash=''
+        )
+        Embedding.objects.filter(id=unchanged.id).update(
+            synced_metadata_hash=calculate_metadata_hash(build_summary_payload(unchanged))
+        )
+        Embedding.objects.filter(id=changed.id).update(synced_metadata_hash='stale')
+
+        service = CoreSyncService()
+        with mock.patch.object(service, '_send_to_core', return_value={'success': True}) as send:
+            result = service.sync_changed_metadata()
+
+        sent_ids = [p['id'] for p in send.call_args.args[0]]
+        self.assertEqual(sent_ids, [str(changed.id)])
+        self.assertEqual(result['changed'], 1)
+        self.assertEqual(result['unchanged'], 1)
+
+        for emb in Embedding.objects.filter(id__in=[unchanged.id, changed.id]):
+            self.assertNotEqual(emb.metadata_hash, '')
+            self.assertEqual(emb.synced_metadata_hash, emb.metadata_hash)
+
+
+@override_settings(EMBEDDING_DIMENSION=PayloadBuilderTestMixin.DIM)
+class SyncNewEmbeddingsTest(PayloadBuilderTestMixin, TestCase):
+    """تست sync embedding های جدید با ستون‌های محدود"""
+
+    def setUp(self):
+        CoreConfig.objects.filter(pk=1).delete()
+        CoreConfig.objects.create(pk=1, is_active=True, auto_sync_enabled=True)
+
+    def test_deferred_columns_are_not_loaded_per_embedding(self):
+        for result in ({'success': True}, {'success': False, 'error': 'down'}):
+            with self.subTest(success=result['success']):
+                Embedding.objects.update(synced_to_core=False)
+                service = CoreSyncService()
+                with mock.patch.object(service, '_send_to_core', return_value=result), \
+                     CaptureQueriesContext(connection) as ctx:
+                    service.sync_new_embeddings(batch_size=len(self.embeddings))
+                embedding_selects = [
+                    q['sql'] for q in ctx.captured_queries
+                    if q['sql'].startswith('SELECT') and 'FROM "embeddings_embedding"' in q['sql']
+                ]
+                # batch با only() + یک snapshot کامل برای ردیف‌های history (نه یکی به ازای هر embedding)
+                self.assertEqual(len(embedding_selects), 2)
+
+    def test_status_changes_are_recorded_in_history(self):
+        for result in ({'success': True}, {'success': False, 'error': 'down'}):
+            with self.subTest(success=result['success']):
+                Embedding.objects.update(synced_to_core=False)
+                before = Embedding.history.count()
+                service = CoreSyncService()
+                with mock.patch.object(service, '_send_to_core', return_value=result):
+                    service.sync_new_embeddings(batch_size=2)
+                self.assertEqual(Embedding.history.count(), before + 2)
+
+    def test_failed_batch_increments_retry_count(self):
+        service = CoreSyncService()
+        with mock.patch.object(service, '_send_to_core', return_value={'success': False, 'error': 'down'}):
+            service.sync_new_embeddings(batch_size=2)
+        self.assertEqual(
+            sorted(Embedding.objects.values_list('sync_retry_count', flat=True)),
+            [0] * (len(self.embeddings) - 2) + [1, 1]
+        )
+
+
+@override_settings(EMBEDDING_DIMENSION=PayloadBuilderTestMixin.DIM, CORE_SYNC_WORKERS=2)
+class SyncAllEmbeddingsTest(PayloadBuilderTestMixin, TestCase):
+    """تست sync کامل با ارسال همزمان batch ها"""
+
+    def setUp(self):
+        CoreConfig.objects.filter(pk=1).delete()
+        CoreConfig.objects.create(pk=1, is_active=True, auto_sync_enabled=True, sync_batch_size=2)
+
+    def test_all_batches_are_sent_and_marked_synced(self):
+        service = CoreSyncService()
+        response = {'success': True, 'response': {}}
+        with mock.patch.object(service, '_post_to_core', return_value=response) as post, \
+             mock.patch.object(service, '_save_sync_logs'):
+            result = service.sync_all_embeddings()
+
+        sent_ids = [p['id'] for call in post.call_args_list for p in call.args[0]]
+        self.assertEqual(sorted(sent_ids), sorted(str(e.id) for e in self.embeddings))
+        self.assertEqual(post.call_count, 4)
+        self.assertEqual(result['total_synced'], len(self.embeddings))
+        self.assertEqual(result['total_errors'], 0)
+        self.assertFalse(Embedding.objects.filter(synced_to_core=False).exists())
+
+    def test_pending_sync_uses_batch_size_without_reset(self):
+        synced = self.embeddings[0]
+        Embedding.objects.filter(id=synced.id).update(synced_to_core=True)
+
+        service = CoreSyncService()
+        response = {'success': True, 'response': {}}
+        with mock.patch.object(service, '_post_to_core', return_value=response) as post, \
+             mock.patch.object(service, '_save_sync_logs'):
+            result = service.sync_pending_embeddings(batch_size=3)
+
+        sent_ids = {p['id'] for call in post.call_args_list for p in call.args[0]}
+        self.assertNotIn(str(synced.id), sent_ids)
+        self.assertEqual(len(sent_ids), len(self.embeddings) - 1)
+        self.assertEqual(post.call_count, -(-(len(self.embeddings) - 1) // 3))
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['total_synced'], len(self.embeddings) - 1)
+
+    @override_settings(CORE_SYNC_WORKERS=1)
+    def test_stops_after_failed_batch(self):
+        service = CoreSyncService()
+        with mock.patch.object(service, '_post_to_core', return_value={'success': False, 'error': 'down'}) as post:
+            result = service.sync_all_embeddings()
+
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(result['total_errors'], 1)
+        self.assertEqual(Embedding.objects.filter(sync_error='down').count(), 2)
+
+
+@override_settings(EMBEDDING_DIMENSION=PayloadBuilderTestMixin.DIM, CORE_SYNC_WORKERS=3)
+class VerifyBatchTest(PayloadBuilderTestMixin, TestCase):
+    """تست verification دسته‌ای نودها"""
+
+    def setUp(self):
+        chunks = list(Chunk.objects.filter(unit__isnull=False))
+        self.logs = [SyncLog.create_sync_log(node_id=str(chunk.id), chunk=chunk) for chunk in chunks]
+        self.missing = str(self.logs[1].node_id)
+
+    def assert_one_missing(self, result):
+        self.assertEqual(result, {'total': len(self.logs), 'verified': len(self.logs) - 1, 'failed': 1})
+        statuses = dict(SyncLog.objects.values_list('node_id', 'status'))
+        self.assertEqual(statuses.pop(self.logs[1].node_id), 'pending_retry')
+        self.assertEqual(set(statuses.values()), {'verified'})
+
+    @override_settings(CORE_BULK_VERIFY_ENABLED=True)
+    def test_bulk_endpoint_results_are_applied(self):
+        response = mock.Mock(status_code=200, content=json.dumps({'results': [
+            {'node_id': str(log.node_id), 'exists': str(log.node_id) != self.missing}
+            for log in self.logs
+        ]}).encode())
+        session = mock.Mock()
+        session.post.return_value = response
+
+        service = CoreSyncService()
+        with mock.patch('ingest.core.sync.sync_service.core_http_session', return_value=session), \
+             mock.patch.object(service, 'verify_node_in_core') as single:
+            result = service.verify_batch(batch_size=10)
+
+        self.assertEqual(session.post.call_count, 1)
+        single.assert_not_called()
+        self.assert_one_missing(result)
+
+    @override_settings(CORE_BULK_VERIFY_ENABLED=True)
+    def test_falls_back_to_single_requests_without_bulk_endpoint(self):
+        def verify(node_id):
+            if node_id == self.missing:
+                return {'exists': False, 'node_id': node_id}
+            return {'exists': True, 'node_id': node_id, 'node': {}}
+
+        service = CoreSyncService()
+        with mock.patch.object(service, 'verify_nodes_bulk', return_value=None) as bulk, \
+             mock.patch.object(service, 'verify_node_in_core', side_effect=verify):
+            result = service.verify_batch(batch_size=10)
+
+        bulk.assert_called_once()
+        self.assertFalse(service._bulk_verify_supported)
+        self.assert_one_missing(result)
+
+    def test_bulk_endpoint_not_called_by_default(self):
+        def verify(node_id):
+            return {'exists': node_id != self.missing, 'node_id': node_id, 'node': {}}
+
+        service = CoreSyncService()
+        with mock.patch.object(service, 'verify_nodes_bulk') as bulk, \
+             mock.patch.object(service, 'verify_node_in_core', side_effect=verify):
+            result = service.verify_batch(batch_size=10)
+
+        bulk.assert_not_called()
+        self.assert_one_missing(result)
+
+    def test_index_wait_stops_when_node_visible(self):
+        service = CoreSyncService()
+        visible = [{'exists': False}, {'exists': False}, {'exists': True}]
+        with mock.patch.object(service, 'verify_node_in_core', side_effect=visible) as verify, \
+             mock.patch('ingest.core.sync.sync_service.time.sleep') as sleep:
+            self.assertTrue(service._wait_for_core_index())
+
+        self.assertEqual(verify.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+        latest = SyncLog.objects.order_by('-synced_at').first()
+        verify.assert_called_with(str(latest.node_id))
+
+    @mock.patch('ingest.core.sync.sync_service.CORE_INDEX_WAIT', 0.05)
+    def test_index_wait_gives_up_after_deadline(self):
+        service = CoreSyncService()
+        with mock.patch.object(service, 'verify_node_in_core', return_value={'exists': False}):
+            self.assertFalse(service._wait_for_core_index())
+
+
+@override_settings(EMBEDDING_DIMENSION=PayloadBuilderTestMixin.DIM)
+class SaveSyncLogsTest(PayloadBuilderTestMixin, TestCase):
+    """تست ذخیره دسته‌ای SyncLog"""
+
+    def test_logs_and_node_ids_saved_for_chunk_embeddings(self):
+        embedding_ids = [str(emb.id) for emb in self.embeddings]
+        node_ids = [str(uuid.uuid4()) for _ in embedding_ids]
+        service = CoreSyncService()
+
+        # embedding ها، chunk ها، UPDATE دسته‌ای node_id، snapshot و INSERT دسته‌ای
+        # HistoricalChunk، INSERT دسته‌ای SyncLog (+ savepoint)
+        with self.assertNumQueries(8):
+            service._save_sync_logs(embedding_ids, node_ids, '2024-01-01T00:00:00+00:00')
+
+        chunk_count = Chunk.objects.count()
+        self.assertEqual(SyncLog.objects.count(), chunk_count)
+        self.assertFalse(Chunk.objects.filter(node_id__isnull=True).exists())
+        for emb, node_id in zip(self.embeddings[:chunk_count], node_ids):
+            log = SyncLog.objects.get(node_id=node_id)
+            self.assertEqual(log.chunk_id, emb.object_id)
+            self.assertEqual(log.synced_at.year, 2024)
+        self.assertEqual(
+            Chunk.history.filter(history_type='~').count(), chunk_count
+        )
+
+
+@override_settings(EMBEDDING_DIMENSION=PayloadBuilderTestMixin.DIM)
+class CreateSyncStatsTest(PayloadBuilderTestMixin, TestCase):
+    """تست snapshot آمار sync"""
+
+    def test_counts_collected_with_two_aggregates(self):
+        Embedding.objects.filter(id__in=[e.id for e in self.embeddings[:2]]).update(synced_to_core=True)
+        chunks = list(Chunk.objects.all()[:3])
+        for chunk, status in zip(chunks, ['synced', 'verified', 'failed']):
+            SyncLog.objects.create(node_id=uuid.uuid4(), chunk=chunk, status=status, synced_at=timezone.now())
+
+        service = CoreSyncService()
+        with self.assertNumQueries(3):
+            service._create_sync_stats()
+
+        stats = SyncStats.objects.get()
+        self.assertEqual(stats.total_embeddings, len(self.embeddings))
+        self.assertEqual(stats.synced_count, 2)
+        self.assertEqual((stats.verified_count, stats.failed_count, stats.pending_count), (1, 1, 0))
+        self.assertEqual(float(stats.verification_percentage), 100.0)
+
+
+@override_settings(EMBEDDING_DIMENSION=PayloadBuilderTestMixin.DIM)
+class ResyncMetadataCommandTest(PayloadBuilderTestMixin, TestCase):
+    """تست ثبت hash متادیتا در دستور resync_metadata_to_core"""
+
+    def setUp(self):
+        CoreConfig.objects.filter(pk=1).delete()
+        CoreConfig.objects.create(pk=1, is_active=True)
+
+    def test_successful_post_records_synced_metadata_hash(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        chunks = Chunk.objects.exclude(qaentry=None, textentry=None)
+        for chunk in chunks:
+            Chunk.objects.filter(pk=chunk.pk).update(node_id=uuid.uuid4())
+        embeddings = Embedding.objects.filter(object_id__in=[c.id for c in chunks])
+        embeddings.update(synced_to_core=True, synced_metadata_hash='stale')
+
+        session = mock.Mock()
+        session.post.return_value = mock.Mock(status_code=200)
+        with mock.patch(
+            'ingest.apps.embeddings.management.commands.resync_metadata_to_core.core_http_session',
+            return_value=session
+        ):
+            call_command('resync_metadata_to_core', stdout=StringIO())
+
+        self.assertEqual(session.post.call_count, 2)
+        for emb in embeddings:
+            expected = calculate_metadata_hash(build_summary_payload(emb))
+            self.assertEqual(emb.metadata_hash, expected)
+            self.assertEqual(emb.synced_metadata_hash, expected)
+            self.assertIsNotNone(emb.last_metadata_sync)
@@ -0,0 +1,155 @@
+"""
+تست‌های نرمال‌سازی متن فارسی
+"""
+import random
+import string
+import unittest
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ingest.core import text_processing
+from ingest.core.text_processing import TextNormalizer, prepare_for_embedding_batch
+
+
+class NormalizeTextTest(SimpleTestCase):
+    """تست normalize_text و prepare_for_embedding"""
+
+    def setUp(self):
+        self.normalizer = TextNormalizer()
+        text_processing._normalize_cached.cache_clear()
+        text_processing._prepare_for_embedding_cached.cache_clear()
+
+    def test_persian_digits_and_hamza(self):
+        self.assertEqual(self.normalizer.normalize_text('رأی ۱۳۶۱/۰۲/۱۳ مؤسسه مسئول'),
+                         'رای 1361/02/13 موسسه مسئول')
+
+    def test_hamza_presentation_form_removed_after_hazm(self):
+        text_processing._init_hazm()
+        if text_processing._HAZM_NORM is None:
+            raise unittest.SkipTest('hazm not installed')
+        self.assertEqual(self.normalizer.normalize_text('شی\ufe80 ۱'), 'شی 1')
+
+    def test_prepare_for_embedding_collapses_zwnj_and_whitespace(self):
+        self.assertEqual(self.normalizer.prepare_for_embedding(' کتاب‌ها \x01\n  ۱۲ '), 'کتاب ها 12')
+
+    def test_fused_prepare_matches_normalize_then_clean(self):
+        texts = ['کتاب‌ها ۱۲ رأی\u200dمؤسسه \x85', 'a "b". c\x01', 'Hello  World', 'يك ٣ ء']
+        texts.append(texts[0] * (text_processing.NORMALIZE_CACHE_MAX_LENGTH // len(texts[0]) + 1))
+        for text in texts:
+            normalized = self.normalizer.normalize_text(text)
+            expected = ' '.join(
+                text_processing._RE_CTRL.sub('', normalized.replace('\u200c', ' ').replace('\u200d', ' ')).split()
+            )
+            self.assertEqual(self.normalizer.prepare_for_embedding(text), expected, repr(text))
+
+    def test_decomposed_input_matches_composed(self):
+        decomposed = '\u0627\u0653\u0628 \u0631\u0627\u0654\u06cc'  # آب رأی با ترکیب جدا
+        self.assertEqual(self.normalizer.normalize_text(decomposed), self.normalizer.normalize_text('آب رأی'))
+        self.assertEqual(self.normalizer.normalize_text(decomposed), 'آب رای')
+
+    def test_short_text_cached_long_text_not(self):
+        with mock.patch.object(TextNormalizer, '_normalize', autospec=True, return_value='x') as normalize:
+            self.normalizer.normalize_text('سلام دنیا')
+            self.normalizer.normalize_text('سلام دنیا')
+            self.normalizer.normalize_text('سلام دنیا', apply_stemming=True)
+            self.assertEqual(normalize.call_count, 2)
+
+            long_text = 'س' * (text_processing.NORMALIZE_CACHE_MAX_LENGTH + 1)
+            self.normalizer.normalize_text(long_text)
+            self.normalizer.normalize_text(long_text)
+            self.assertEqual(normalize.call_count, 4)
+
+    def test_chunk_sized_text_not_cached(self):
+        """متن در اندازه chunk (چند صد کاراکتر) وارد cache ها نمی‌شود"""
+        chunk_text = 'متن ماده قانونی ' * 30
+        self.normalizer.normalize_text(chunk_text)
+        self.normalizer.prepare_for_embedding(chunk_text)
+        self.assertEqual(text_processing._normalize_cached.cache_info().currsize, 0)
+        self.assertEqual(text_processing._prepare_for_embedding_cached.cache_info().currsize, 0)
+
+    def test_batch_matches_single_and_dedupes(self):
+        texts = ['کتاب‌ها ۱۲', '', 'Hello', 'کتاب‌ها ۱۲', None]
+        with mock.patch.object(
+            TextNormalizer, 'prepare_for_embedding', autospec=True,
+            side_effect=TextNormalizer.prepare_for_embedding
+        ) as prepare:
+            results = prepare_for_embedding_batch(texts)
+        self.assertEqual(results, [self.normalizer.prepare_for_embedding(t) for t in texts])
+        self.assertEqual(prepare.call_count, 4)
+
+    def test_strip_control_long_text_matches_regex(self):
+        chunk = 'متن\x00 ab\x85\t\x9f\xa0😀\n'
+        text = chunk * (text_processing._NUMPY_CTRL_MIN_LENGTH // len(chunk) + 1)
+        self.assertEqual(text_processing._strip_control(text), text_processing._RE_CTRL.sub('', text))
+        clean = 'س' * text_processing._NUMPY_CTRL_MIN_LENGTH
+        self.assertIs(text_processing._strip_control(clean), clean)
+
+    def test_basic_normalize_without_hazm(self):
+        self.assertEqual(
+            self.normalizer._basic_normalize(' يك ۱۲٣ ء\u200cx\u200ey\u200dz '),
+            'یک 123 xy z'
+        )
+
+    def test_replacement_tables_have_no_duplicate_keys(self):
+        for name in ('_BASIC_PAIRS', '_PRE_HAZM_PAIRS', '_EMBEDDING_POST_HAZM_PAIRS'):
+            keys = [old for old, _ in getattr(text_processing, name)]
+            self.assertEqual(len(keys), len(set(keys)), name)
+
+    def test_hazm_failure_falls_back_to_basic_normalize(self):
+        text_processing._init_hazm()
+        if text_processing._HAZM_NORM is None:
+            raise unittest.SkipTest('hazm not installed')
+
+        text = ' يك ۱۲٣ رأی‌x‎y '
+        with mock.patch.object(text_processing._HAZM_NORM, 'normalize', side_effect=RuntimeError), \
+                self.assertLogs(text_processing.logger, 'WARNING'):
+            self.assertEqual(self.normalizer.normalize_text(text), 'یک 123 رای xy')
+
+    def test_stemming_keeps_word_when_stemmer_fails(self):
+        text_processing._init_hazm()
+        if text_processing._HAZM_STEM is None:
+            raise unittest.SkipTest('hazm not installed')
+
+        def stem(word):
+            if word == 'کتابها':
+                raise ValueError(word)
+            return word + '*'
+
+        with mock.patch.object(text_processing._HAZM_STEM, 'stem', side_effect=stem):
+            result = self.normalizer.normalize_text('کتابها خوب', apply_stemming=True)
+        self.assertEqual(result, 'کتابها خوب*')
+
+    def test_ascii_fast_path_matches_hazm(self):
+        text_processing._init_hazm()
+        if text_processing._HAZM_NORM is None:
+            raise unittest.SkipTest('hazm not installed')
+        # پس از ارتقای hazm: اگر این تست با مسیر سریع پاس شد، نسخه را به
+        # _HAZM_ASCII_VERIFIED_VERSIONS اضافه کنید
+        self.assertTrue(text_processing._HAZM_ASCII_FAST_PATH, 'hazm version not verified for ASCII fast path')
+
+        rng = random.Random(0)
+        alphabet = string.printable
+        samples = ['Hello World', 'a  b\n\nc\t d ', 'x...y', '"quoted"', 'e.g. 3.14 %', '10/12/2020']
+        samples += [
+            ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 40)))
+            for _ in range(500)
+        ]
+        for text in samples:
+            expected = text_processing._HAZM_NORM.normalize(text)
+            self.assertEqual(self.normalizer.normalize_text(text), expected, repr(text))
+
+    def test_ascii_fast_path_disabled_for_unverified_hazm(self):
+        text_processing._init_hazm()
+        if text_processing._HAZM_NORM is None:
+            raise unittest.SkipTest('hazm not installed')
+
+        with mock.patch('importlib.metadata.version', return_value='0.11.0'):
+            self.assertFalse(text_processing._hazm_version_verified())
+
+        text = 'e.g. "quoted" 3.14'
+        with mock.patch.object(text_processing, '_HAZM_ASCII_FAST_PATH', False), \
+             mock.patch.object(text_processing, '_hazm_normalize_ascii') as fast_path:
+            self.assertEqual(self.normalizer.normalize_text(text), text_processing._HAZM_NORM.normalize(text))
+            self.normalizer.prepare_for_embedding(text)
+        fast_path.assert_not_called()
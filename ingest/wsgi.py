@@ -15,4 +15,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ingest.settings.prod')
 
 application = get_wsgi_application()
 
+# Load hazm at worker boot instead of on the first request
+from ingest.core.text_processing import warm_up_text_normalizer  # noqa: E402
+warm_up_text_normalizer()
+
 # Embedding is now registered directly in embeddings/admin.py